@@ -11,7 +11,64 @@ class Settings(BaseSettings):
     cors_origins: str = "*"
     encryption_key: str = "change-me-generate-a-real-fernet-key"
     anthropic_api_key: str = ""
+    anthropic_model: str = "claude-sonnet-4-5-20250929"
+    anthropic_max_tokens: int = 2048
+    anthropic_timeout_seconds: float = 60.0
+    anthropic_max_retries: int = 2
+    agent_tool_concurrency: int = 4
+    agent_tool_timeout_seconds: float = 30.0  # for all tool calls of one turn together
+    agent_snapshot_max_age_seconds: int = 300  # tools answer from snapshot widgets younger than this
+    agent_toolset_ttl_seconds: int = 300
+    agent_toolset_cache_size: int = 1024
     refresh_interval_seconds: int = 300
+    dashboard_refresh_concurrency: int = 4
+    dashboard_cache_size: int = 1024
+    dashboard_cache_ttl_seconds: int = 30
+    dashboard_stream_keepalive_seconds: int = 15
+    dashboard_stale_after_seconds: int = 900  # 0 disables stale-while-revalidate
+    # Widget payload storage: "json" (inline), "zlib", or "zstd" (needs the zstandard package)
+    snapshot_storage_codec: str = "json"
+    snapshot_compress_min_bytes: int = 1024
+
+    # Adaptive refresh: back off for idle users and for endpoints whose data doesn't change
+    adaptive_idle_after_seconds: int = 3600
+    adaptive_max_interval_seconds: int = 6 * 3600
+    adaptive_unchanged_threshold: int = 3
+    adaptive_max_volatility_factor: float = 8.0
+    activity_write_interval_seconds: int = 60
+
+    # Background scheduler (coordinated across workers through Mongo leases)
+    scheduler_shards: int = 16
+    scheduler_lease_ttl_seconds: int = 30
+    scheduler_sync_seconds: int = 30
+    scheduler_workers: int = 8
+    scheduler_jitter_seconds: int = 30
+    scheduler_refresh_timeout_seconds: int = 120
+
+    # Upstream HTTP connection pool (one client per upstream origin)
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = True
+    upstream_max_concurrency_per_connection: int = 4
+    upstream_max_concurrency_per_host: int = 8
+    upstream_rate_limit_per_second: float = 5.0  # per upstream host; 0 disables
+    upstream_rate_limit_burst: int = 10
+    upstream_max_retry_after_seconds: int = 30
+    upstream_max_response_bytes: int = 5 * 1024 * 1024
+    upstream_json_thread_threshold_bytes: int = 256 * 1024
+    upstream_max_pages: int = 20
+    upstream_max_items: int = 5000
+
+    # Circuit breakers per upstream connection and host
+    circuit_breaker_failure_threshold: int = 3
+    circuit_breaker_reset_seconds: int = 30
+    circuit_breaker_max_backoff_seconds: int = 600
+
+    # Upstream login token cache
+    upstream_token_refresh_skew_seconds: int = 60
+    upstream_token_default_ttl_seconds: int = 900
+    upstream_token_cache_size: int = 1024
 
     class Config:
         env_file = ".env"
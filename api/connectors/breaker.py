@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.config import get_settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    # Same rule the host breaker applies in RESTConnector._request: only a service that can't
+    # be reached or answers 5xx is down. Bad config, 4xx and oversized bodies say nothing about
+    # its health, and an open circuit (or rate-limit pause) elsewhere isn't a new failure.
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_after: float = 30.0, max_backoff: float = 600.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0  # consecutive opens; each one doubles the wait before the next probe
+        self.retry_at = 0.0
+
+    def _backoff(self) -> float:
+        return min(self.max_backoff, self.reset_after * 2 ** max(0, self.trips - 1))
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if now < self.retry_at:
+            return False
+        # Let one probe through; if it never reports back, another is allowed after the backoff
+        self.state = HALF_OPEN
+        self.retry_at = now + self._backoff()
+        return True
+
+    def retry_in(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trips += 1
+            self.state = OPEN
+            self.retry_at = time.monotonic() + self._backoff()
+
+
+class BreakerRegistry:
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_after: float = 30.0,
+        max_backoff: float = 600.0,
+        max_entries: int = 4096,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.max_backoff = max_backoff
+        self.max_entries = max_entries
+        self._breakers: OrderedDict[str, CircuitBreaker] = OrderedDict()
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_after, self.max_backoff)
+            self._breakers[key] = breaker
+            while len(self._breakers) > self.max_entries:
+                # Least recently checked first; breakers in use are touched on every request
+                self._breakers.popitem(last=False)
+        self._breakers.move_to_end(key)
+        return breaker
+
+    def connection(self, connection_id: str) -> CircuitBreaker:
+        return self.get(f"conn:{connection_id}")
+
+    def host(self, url: str) -> CircuitBreaker:
+        return self.get(f"host:{urlsplit(url).netloc.lower()}")
+
+    def reset_connection(self, connection_id: str):
+        self._breakers.pop(f"conn:{connection_id}", None)
+
+
+@lru_cache
+def get_breakers() -> BreakerRegistry:
+    settings = get_settings()
+    return BreakerRegistry(
+        failure_threshold=settings.circuit_breaker_failure_threshold,
+        reset_after=settings.circuit_breaker_reset_seconds,
+        max_backoff=settings.circuit_breaker_max_backoff_seconds,
+    )
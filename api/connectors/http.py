@@ -0,0 +1,116 @@
+import asyncio
+import importlib.util
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.config import get_settings
+from api.connectors.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class HTTPClientPool:
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        max_concurrency_per_host: int = 8,
+        rate_limit_per_host: float = 0.0,
+        rate_limit_burst: float = 10.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # HTTP/2 needs "h2" (pulled in by httpx[http2]); fall back to HTTP/1.1 keep-alive without it
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.rate_limit_per_host = rate_limit_per_host
+        self.rate_limit_burst = rate_limit_burst
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._rate_limits: dict[str, TokenBucket] = {}
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        origin = _origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+            self._clients[origin] = client
+        return client
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        origin = _origin(url)
+        limit = self._host_limits.get(origin)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_concurrency_per_host)
+            self._host_limits[origin] = limit
+        return limit
+
+    def rate_limit(self, url: str) -> TokenBucket:
+        origin = _origin(url)
+        bucket = self._rate_limits.get(origin)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_limit_per_host, self.rate_limit_burst)
+            self._rate_limits[origin] = bucket
+        return bucket
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+_pool: HTTPClientPool | None = None
+
+
+def init_http_pool() -> HTTPClientPool:
+    global _pool
+    settings = get_settings()
+    _pool = HTTPClientPool(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        http2=settings.http2_enabled,
+        max_concurrency_per_host=settings.upstream_max_concurrency_per_host,
+        rate_limit_per_host=settings.upstream_rate_limit_per_second,
+        rate_limit_burst=settings.upstream_rate_limit_burst,
+    )
+    return _pool
+
+
+async def close_http_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+
+
+def _get_pool() -> HTTPClientPool:
+    # Lazily create the pool for code running outside the app lifespan (scripts, shells)
+    return _pool or init_http_pool()
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    return _get_pool().get(url)
+
+
+def get_host_limit(url: str) -> asyncio.Semaphore:
+    return _get_pool().host_limit(url)
+
+
+def get_rate_limit(url: str) -> TokenBucket:
+    return _get_pool().rate_limit(url)
@@ -0,0 +1,73 @@
+from typing import Any
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from api.schemas.orm.connection import PaginationConfig
+
+
+def _origin(url: str) -> tuple[str, str]:
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc.lower()
+
+
+def _lookup(data: Any, path: str | None) -> Any:
+    if not path:
+        return data
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def page_items(data: Any, paging: PaginationConfig) -> list:
+    items = _lookup(data, paging.items_path)
+    if not isinstance(items, list):
+        raise ValueError(f"Paged response has no item list at '{paging.items_path or '.'}'")
+    return items
+
+
+def total_items(resp: httpx.Response, data: Any, paging: PaginationConfig) -> int | None:
+    total = None
+    if paging.total_header:
+        total = resp.headers.get(paging.total_header)
+    elif paging.total_path:
+        total = _lookup(data, paging.total_path)
+    try:
+        return int(total) if total is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def page_params(paging: PaginationConfig, index: int, page_size: int | None) -> dict:
+    # Query params for the index-th page (0-based); cursor and link styles only get the limit
+    params = {}
+    if paging.page_size:
+        params[paging.limit_param] = paging.page_size
+    if paging.style == "page":
+        params[paging.page_param] = paging.start_page + index
+    elif paging.style == "offset" and index:
+        params[paging.offset_param] = index * (page_size or 0)
+    return params
+
+
+def next_cursor_params(data: Any, paging: PaginationConfig) -> dict | None:
+    cursor = _lookup(data, paging.cursor_path)
+    if cursor in (None, ""):
+        return None
+    params = {paging.cursor_param: cursor}
+    if paging.page_size:
+        params[paging.limit_param] = paging.page_size
+    return params
+
+
+def next_link(resp: httpx.Response, base_url: str) -> str | None:
+    link = resp.links.get("next", {}).get("url")
+    if not link:
+        return None
+    url = urljoin(str(resp.url), link)
+    # Never follow a link off the connection's origin: the request carries its credentials
+    if _origin(url) != _origin(base_url):
+        return None
+    return url
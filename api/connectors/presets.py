@@ -1,3 +1,8 @@
+# Only the fields the dashboard widgets read are kept (TasksWidget renders every track
+# endpoint, CalendarWidget every calendar one)
+TRACK_FIELDS = ["id", "name", "title", "status", "project_name", "project.name"]
+EVENT_FIELDS = ["id", "title", "name", "date", "start_time", "end_time", "time", "all_day"]
+
 PRESETS: dict[str, list[dict]] = {
     "track": [
         {
@@ -5,18 +10,24 @@ PRESETS: dict[str, list[dict]] = {
             "path": "/api/tasks",
             "method": "GET",
             "dashboard_label": "Tasks",
+            "refresh_interval": 300,
+            "fields": TRACK_FIELDS,
         },
         {
             "name": "tasks_active",
             "path": "/api/tasks?active=true",
             "method": "GET",
             "dashboard_label": "Active Tasks",
+            "refresh_interval": 60,
+            "fields": TRACK_FIELDS,
         },
         {
             "name": "projects",
             "path": "/api/projects",
             "method": "GET",
             "dashboard_label": "Projects",
+            "refresh_interval": 900,
+            "fields": TRACK_FIELDS,
         },
     ],
     "calendar": [
@@ -25,6 +36,8 @@ PRESETS: dict[str, list[dict]] = {
             "path": "/api/weeks/current",
             "method": "GET",
             "dashboard_label": "This Week",
+            "refresh_interval": 3600,
+            "fields": EVENT_FIELDS,
         },
     ],
 }
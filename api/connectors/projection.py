@@ -0,0 +1,40 @@
+from functools import lru_cache
+from typing import Any
+
+
+@lru_cache(maxsize=256)
+def _compile(fields: tuple[str, ...]) -> dict:
+    # ("id", "project.name") -> {"id": {}, "project": {"name": {}}}
+    tree: dict = {}
+    for path in fields:
+        parts = [p for p in path.split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if node.get(part) == {}:
+                # "project" was selected whole, so "project.name" adds nothing
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = {}
+    return tree
+
+
+def _project(data: Any, tree: dict) -> Any:
+    if isinstance(data, list):
+        # Paths apply to each item, so "id" keeps the id of every element of a list
+        return [_project(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+    projected = {}
+    for key, subtree in tree.items():
+        if key in data:
+            projected[key] = _project(data[key], subtree) if subtree else data[key]
+    return projected
+
+
+def project_fields(data: Any, fields: list[str] | None) -> Any:
+    if not fields:
+        return data
+    return _project(data, _compile(tuple(fields)))
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from api.connectors.breaker import CircuitOpenError
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    # Retry-After is either delay-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate  # tokens per second; 0 disables limiting (Retry-After pauses still apply)
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _check_pause(self, max_wait: float | None) -> float:
+        # Waiting out a long Retry-After would hold the lock and every caller behind it
+        wait = self.paused_until - time.monotonic()
+        if max_wait is not None and wait > max_wait:
+            raise CircuitOpenError(f"Upstream is rate limiting requests, next attempt in {wait:.0f}s")
+        return wait
+
+    async def acquire(self, max_wait: float | None = None):
+        self._check_pause(max_wait)
+        async with self._lock:
+            while True:
+                wait = self._check_pause(max_wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                now = time.monotonic()
+                if self.rate <= 0:
+                    return
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -1,92 +1,361 @@
+import asyncio
+import hashlib
+import json
+import math
+
 import httpx
 
+from api.config import get_settings
+from api.connectors import pagination
+from api.connectors.breaker import CircuitOpenError, get_breakers
+from api.connectors.http import get_host_limit, get_http_client, get_rate_limit
+from api.connectors.projection import project_fields
+from api.connectors.ratelimit import retry_after_seconds
+from api.connectors.tokens import UpstreamAuth, get_token_cache
 from api.schemas.orm.connection import EndpointConfig
+from api.utils import metrics
+from api.utils.singleflight import SingleFlight
+
+# Shared across connector instances, so identical requests from different users coalesce
+_inflight = SingleFlight()
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+async def _parse_json(body: bytes, fields: list[str] | None):
+    if len(body) >= get_settings().upstream_json_thread_threshold_bytes:
+        # Large payloads are parsed (and projected) off the event loop
+        metrics.incr("upstream_json_offloaded")
+        return await asyncio.to_thread(lambda: project_fields(json.loads(body), fields))
+    return project_fields(json.loads(body), fields)
 
 
 class RESTConnector:
-    def __init__(self, timeout: float = 15.0):
+    def __init__(self, timeout: float = 15.0, max_concurrency: int | None = None):
         self.timeout = timeout
+        if max_concurrency is None:
+            max_concurrency = get_settings().upstream_max_concurrency_per_connection
+        self.max_concurrency = max(1, max_concurrency)
 
     async def authenticate(
         self, base_url: str, auth_type: str, credentials: dict
     ) -> str | None:
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            if auth_type == "jwt_password":
-                # OAuth2 form-based login (like track app)
-                resp = await client.post(
-                    f"{base_url}/api/auth/login",
-                    data={
-                        "username": credentials.get("username", ""),
-                        "password": credentials.get("password", ""),
-                    },
-                    headers={"Content-Type": "application/x-www-form-urlencoded"},
-                )
-                resp.raise_for_status()
-                return resp.json().get("access_token")
-
-            elif auth_type == "jwt_json":
-                # JSON body login
-                resp = await client.post(
-                    f"{base_url}/api/auth/login",
-                    json=credentials,
-                )
-                resp.raise_for_status()
-                return resp.json().get("access_token")
+        client = get_http_client(base_url)
 
-            elif auth_type == "api_key":
-                # API key doesn't need auth call, just return the key
-                return credentials.get("api_key")
+        if auth_type == "jwt_password":
+            # OAuth2 form-based login (like track app)
+            resp = await client.post(
+                f"{base_url}/api/auth/login",
+                data={
+                    "username": credentials.get("username", ""),
+                    "password": credentials.get("password", ""),
+                },
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            return resp.json().get("access_token")
+
+        elif auth_type == "jwt_json":
+            # JSON body login
+            resp = await client.post(
+                f"{base_url}/api/auth/login",
+                json=credentials,
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            return resp.json().get("access_token")
+
+        elif auth_type == "api_key":
+            # API key doesn't need auth call, just return the key
+            return credentials.get("api_key")
 
-            return None
+        return None
+
+    async def get_token(
+        self, auth: UpstreamAuth, stale_token: str | None = None
+    ) -> str | None:
+        return await get_token_cache().get(
+            auth.cache_key,
+            lambda: self.authenticate(auth.base_url, auth.auth_type, auth.credentials),
+            stale_token=stale_token,
+        )
 
     async def test_connection(self, base_url: str, token: str | None = None) -> bool:
         headers = {}
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                resp = await client.get(f"{base_url}/api/health", headers=headers)
-                return resp.status_code == 200
-            except httpx.HTTPError:
-                return False
+        client = get_http_client(base_url)
+        try:
+            resp = await client.get(
+                f"{base_url}/api/health", headers=headers, timeout=self.timeout
+            )
+            return resp.status_code == 200
+        except httpx.HTTPError:
+            return False
 
-    async def fetch_endpoint(
+    async def _request(
         self,
         base_url: str,
         token: str | None,
         endpoint: EndpointConfig,
-    ) -> dict:
+        validators: dict | None = None,
+        params: dict | None = None,
+        url: str | None = None,
+    ) -> tuple[httpx.Response, bytes]:
         headers = {}
         if token:
             headers["Authorization"] = f"Bearer {token}"
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        max_bytes = endpoint.max_response_bytes or get_settings().upstream_max_response_bytes
+        client = get_http_client(base_url)
+        request = client.build_request(
+            endpoint.method,
+            url or f"{base_url}{endpoint.path}",
+            params=params,
+            headers=headers,
+            timeout=self.timeout,
+        )
+        settings = get_settings()
+        breaker = get_breakers().host(base_url)
+        rate_limit = get_rate_limit(base_url)
+        for attempt in range(2):
+            if not breaker.allow():
+                raise CircuitOpenError(
+                    f"{request.url.host} is unavailable, next attempt in {breaker.retry_in():.0f}s"
+                )
+            await rate_limit.acquire(max_wait=settings.upstream_max_retry_after_seconds)
+            try:
+                resp, body = await self._send(client, request, base_url, max_bytes)
+            except httpx.TransportError:
+                # Timeouts and connection errors: the host itself is in trouble
+                breaker.record_failure()
+                raise
+            if resp.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if resp.status_code not in (429, 503):
+                break
+            # The host is shedding load: hold every request to it, not just this one
+            delay = retry_after_seconds(resp.headers.get("retry-after"))
+            if delay is None and resp.status_code == 429:
+                delay = 1.0
+            if delay is None:
+                break
+            metrics.incr("upstream_rate_limited")
+            # Nobody sleeps longer than upstream_max_retry_after_seconds (acquire fails fast
+            # instead), and a bogus header can't block the host for longer than a tripped breaker
+            rate_limit.pause(min(delay, settings.circuit_breaker_max_backoff_seconds))
+            if attempt or delay > settings.upstream_max_retry_after_seconds:
+                break
+
+        if body is None:
+            metrics.incr("upstream_responses_too_large")
+            raise ResponseTooLarge(f"Response from {endpoint.path} exceeds the {max_bytes}-byte limit")
+        return resp, body
+
+    async def _send(
+        self, client: httpx.AsyncClient, request: httpx.Request, base_url: str, max_bytes: int
+    ) -> tuple[httpx.Response, bytes | None]:
+        # Returns body None when it goes over max_bytes
+        async with get_host_limit(base_url):
+            resp = await client.send(request, stream=True)
+            try:
+                # Stop reading as soon as the body goes over the cap instead of buffering it all
+                length = resp.headers.get("content-length", "")
+                if length.isdigit() and int(length) > max_bytes:
+                    return resp, None
+                body = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    body += chunk
+                    if len(body) > max_bytes:
+                        return resp, None
+                return resp, bytes(body)
+            finally:
+                await resp.aclose()
+
+    async def _authorized_request(
+        self,
+        base_url: str,
+        token: str | None,
+        endpoint: EndpointConfig,
+        auth: UpstreamAuth | None,
+        **kwargs,
+    ) -> tuple[httpx.Response, bytes, str | None]:
+        resp, body = await self._request(base_url, token, endpoint, **kwargs)
+        if resp.status_code == 401 and auth is not None:
+            # Cached upstream token was rejected (revoked or expired early): log in again once
+            token = await self.get_token(auth, stale_token=token)
+            resp, body = await self._request(base_url, token, endpoint, **kwargs)
+        return resp, body, token
+
+    async def _fetch_pages(
+        self,
+        base_url: str,
+        token: str | None,
+        endpoint: EndpointConfig,
+        auth: UpstreamAuth | None,
+    ) -> list:
+        settings = get_settings()
+        paging = endpoint.pagination
+        max_pages = paging.max_pages or settings.upstream_max_pages
+        max_items = paging.max_items or settings.upstream_max_items
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{base_url}{endpoint.path}"
-            resp = await client.request(endpoint.method, url, headers=headers)
+        async def get_page(params: dict | None = None, url: str | None = None):
+            nonlocal token
+            resp, body, token = await self._authorized_request(
+                base_url, token, endpoint, auth, params=params, url=url
+            )
             resp.raise_for_status()
+            data = await _parse_json(body, None)
+            return resp, data, pagination.page_items(data, paging)
+
+        resp, data, page = await get_page(pagination.page_params(paging, 0, paging.page_size))
+        items = list(page)
+        page_size = paging.page_size or len(page)
+        pages = 1
+
+        total = pagination.total_items(resp, data, paging)
+        if paging.style in ("page", "offset") and total is not None and page_size:
+            # Known total: request the remaining pages at once (each still waits on the host limit)
+            count = max(1, min(max_pages, math.ceil(min(total, max_items) / page_size)))
+            rest = await asyncio.gather(*(
+                get_page(pagination.page_params(paging, i, page_size)) for i in range(1, count)
+            ))
+            for _, _, page in rest:
+                items.extend(page)
+            pages = count
+        else:
+            while page and pages < max_pages and len(items) < max_items:
+                if paging.style in ("page", "offset"):
+                    if len(page) < page_size:
+                        break  # a short page is the last one
+                    params, url = pagination.page_params(paging, pages, page_size), None
+                elif paging.style == "cursor":
+                    params, url = pagination.next_cursor_params(data, paging), None
+                    if params is None:
+                        break
+                else:
+                    params, url = None, pagination.next_link(resp, base_url)
+                    if url is None:
+                        break
+                resp, data, page = await get_page(params, url)
+                items.extend(page)
+                pages += 1
+
+        metrics.incr("upstream_pages_fetched", pages)
+        if len(items) > max_items or (total or 0) > len(items):
+            metrics.incr("upstream_pagination_truncated")
+        return items[:max_items]
+
+    async def fetch_endpoint(
+        self,
+        base_url: str,
+        token: str | None,
+        endpoint: EndpointConfig,
+        auth: UpstreamAuth | None = None,
+        validators: dict | None = None,
+    ) -> dict:
+        # Identical requests in flight (same upstream, account, endpoint and validators) share
+        # one fetch, so household members on the same instance and account cost one request
+        key = (
+            base_url,
+            auth.fingerprint if auth else hashlib.sha256((token or "").encode()).hexdigest(),
+            endpoint.method,
+            endpoint.path,
+            endpoint.model_dump_json(include={"fields", "pagination", "max_response_bytes"}),
+            tuple(sorted((validators or {}).items())),
+        )
+        if _inflight.in_flight(key):
+            metrics.incr("upstream_requests_coalesced")
+        result = await _inflight.do(
+            key, lambda: self._fetch_endpoint(base_url, token, endpoint, auth, validators)
+        )
+        # Callers get their own dict (with their own endpoint's name and label); the payload
+        # itself is shared and must not be mutated
+        return {**result, "name": endpoint.name, "label": endpoint.dashboard_label or endpoint.name}
+
+    async def _fetch_endpoint(
+        self,
+        base_url: str,
+        token: str | None,
+        endpoint: EndpointConfig,
+        auth: UpstreamAuth | None,
+        validators: dict | None,
+    ) -> dict:
+        if endpoint.pagination:
+            # Validators would only cover the first page, so paged endpoints are fetched in full
+            items = await self._fetch_pages(base_url, token, endpoint, auth)
             return {
                 "name": endpoint.name,
                 "label": endpoint.dashboard_label or endpoint.name,
-                "data": resp.json(),
+                "data": project_fields(items, endpoint.fields),
+                "etag": None,
+                "last_modified": None,
             }
 
+        resp, body, token = await self._authorized_request(
+            base_url, token, endpoint, auth, validators=validators
+        )
+
+        if validators:
+            metrics.incr("upstream_conditional_requests")
+        if resp.status_code == 304 and validators:
+            # Unchanged since the validators were issued; the caller keeps its previous data
+            metrics.incr("upstream_not_modified")
+            return {
+                "name": endpoint.name,
+                "label": endpoint.dashboard_label or endpoint.name,
+                "not_modified": True,
+            }
+
+        resp.raise_for_status()
+        return {
+            "name": endpoint.name,
+            "label": endpoint.dashboard_label or endpoint.name,
+            "data": await _parse_json(body, endpoint.fields),
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+        }
+
     async def fetch_all(
         self,
         base_url: str,
         token: str | None,
         endpoints: list[EndpointConfig],
+        auth: UpstreamAuth | None = None,
+        validators: dict[str, dict] | None = None,
     ) -> list[dict]:
-        results = []
-        for endpoint in endpoints:
-            try:
-                result = await self.fetch_endpoint(base_url, token, endpoint)
-                results.append(result)
-            except Exception as e:
-                results.append({
-                    "name": endpoint.name,
-                    "label": endpoint.dashboard_label or endpoint.name,
-                    "data": None,
-                    "error": str(e),
-                })
-        return results
+        limit = asyncio.Semaphore(self.max_concurrency)
+        validators = validators or {}
+
+        async def fetch_one(endpoint: EndpointConfig) -> dict:
+            async with limit:
+                try:
+                    return await self.fetch_endpoint(
+                        base_url,
+                        token,
+                        endpoint,
+                        auth=auth,
+                        validators=validators.get(endpoint.name),
+                    )
+                except Exception as e:
+                    return {
+                        "name": endpoint.name,
+                        "label": endpoint.dashboard_label or endpoint.name,
+                        "data": None,
+                        "error": str(e),
+                    }
+
+        # gather keeps results in endpoint order
+        return list(await asyncio.gather(*(fetch_one(e) for e in endpoints)))
@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+import jwt
+
+from api.config import get_settings
+
+_MISS = object()
+
+
+@dataclass
+class UpstreamAuth:
+    connection_id: str
+    base_url: str
+    auth_type: str
+    credentials: dict = field(repr=False)
+
+    @property
+    def fingerprint(self) -> str:
+        raw = json.dumps(
+            [self.base_url, self.auth_type, self.credentials], sort_keys=True, default=str
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @property
+    def cache_key(self) -> tuple[str, str]:
+        return (self.connection_id, self.fingerprint)
+
+
+def token_expiry(token: str | None) -> float | None:
+    if not token:
+        return None
+    try:
+        # We only read the claims; the upstream is the one that verifies the signature
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class TokenCache:
+    def __init__(
+        self,
+        refresh_skew: float = 60.0,
+        default_ttl: float = 900.0,
+        max_entries: int = 1024,
+    ):
+        self.refresh_skew = refresh_skew
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._tokens: OrderedDict[tuple[str, str], tuple[str | None, float]] = OrderedDict()
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    def _fresh(self, key: tuple[str, str], stale_token: str | None):
+        entry = self._tokens.get(key)
+        if entry is None:
+            return _MISS
+        token, refresh_at = entry
+        if time.time() >= refresh_at or (stale_token is not None and token == stale_token):
+            return _MISS
+        self._tokens.move_to_end(key)
+        return token
+
+    def _store(self, key: tuple[str, str], token: str | None):
+        exp = token_expiry(token)
+        if exp is not None:
+            refresh_at = exp - self.refresh_skew
+        else:
+            refresh_at = time.time() + self.default_ttl
+        self._tokens[key] = (token, refresh_at)
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_entries:
+            evicted, _ = self._tokens.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    async def get(
+        self,
+        key: tuple[str, str],
+        login: Callable[[], Awaitable[str | None]],
+        stale_token: str | None = None,
+    ) -> str | None:
+        cached = self._fresh(key, stale_token)
+        if cached is not _MISS:
+            return cached
+
+        # One login per key at a time; concurrent callers reuse its result
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._fresh(key, stale_token)
+            if cached is not _MISS:
+                return cached
+            token = await login()
+            self._store(key, token)
+            return token
+
+    def invalidate_connection(self, connection_id: str):
+        for key in [k for k in self._tokens if k[0] == connection_id]:
+            self._tokens.pop(key, None)
+            self._locks.pop(key, None)
+
+
+@lru_cache
+def get_token_cache() -> TokenCache:
+    settings = get_settings()
+    return TokenCache(
+        refresh_skew=settings.upstream_token_refresh_skew_seconds,
+        default_ttl=settings.upstream_token_default_ttl_seconds,
+        max_entries=settings.upstream_token_cache_size,
+    )
@@ -11,8 +11,12 @@ from api.schemas.orm.user import User
 from api.schemas.orm.connection import ServiceConnection
 from api.schemas.orm.dashboard import DashboardSnapshot
 from api.schemas.orm.chat import ChatSession
+from api.schemas.orm.lease import SchedulerLease
+from api.connectors.http import init_http_pool, close_http_pool
+from api.services.llm import init_llm_client, close_llm_client
 from api.routes import auth, dashboard, connections, agent
 from api.services.scheduler import run_scheduler
+from api.utils.metrics import get_metrics
 
 
 @asynccontextmanager
@@ -22,9 +26,14 @@ async def lifespan(app: FastAPI):
     client = AsyncIOMotorClient(settings.mongodb_url)
     await init_beanie(
         database=client[settings.mongodb_db_name],
-        document_models=[User, ServiceConnection, DashboardSnapshot, ChatSession],
+        document_models=[User, ServiceConnection, DashboardSnapshot, ChatSession, SchedulerLease],
     )
 
+    # Shared upstream HTTP clients (keep-alive, HTTP/2)
+    init_http_pool()
+    # Shared async Anthropic client for the agent
+    init_llm_client()
+
     # Start background scheduler
     scheduler_task = asyncio.create_task(run_scheduler())
 
@@ -36,6 +45,8 @@ async def lifespan(app: FastAPI):
         await scheduler_task
     except asyncio.CancelledError:
         pass
+    await close_http_pool()
+    await close_llm_client()
     client.close()
 
 
@@ -69,6 +80,11 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/metrics")
+async def metrics():
+    return get_metrics()
+
+
 @app.get("/api/schema")
 async def get_schema():
     return app.openapi()
@@ -1,6 +1,10 @@
+import asyncio
+import json
+import logging
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from beanie import PydanticObjectId
 
 from api.schemas.orm.user import User
@@ -12,14 +16,22 @@ from api.schemas.dto.agent import (
     ChatSessionSummary,
     ChatSessionDetail,
 )
-from api.services.agent import chat_with_agent
+from api.services.activity import record_activity
+from api.services.agent import chat_with_agent, run_agent
 from api.utils.auth import get_current_user
+from api.utils.sse import sse_event
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
 
+# Strong references to running agent loops so they aren't garbage-collected mid-run
+_running: set[asyncio.Task] = set()
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)):
+    await record_activity(str(current_user.id))
     response_text, session_id = await chat_with_agent(
         user_id=str(current_user.id),
         message=data.message,
@@ -35,6 +47,42 @@ async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)
     )
 
 
+@router.post("/chat/stream")
+async def chat_stream(data: ChatRequest, current_user: User = Depends(get_current_user)):
+    await record_activity(str(current_user.id))
+    events: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    # The agent runs as its own task so the reply is still completed and saved to the
+    # session if the client disconnects mid-stream
+    async def produce():
+        try:
+            async for event in run_agent(
+                user_id=str(current_user.id),
+                message=data.message,
+                session_id=data.session_id,
+            ):
+                events.put_nowait(event)
+        except Exception as e:
+            logger.error(f"Agent stream failed: {e}")
+            events.put_nowait({"type": "error", "message": str(e)})
+        finally:
+            events.put_nowait(None)
+
+    task = asyncio.create_task(produce())
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+    async def stream():
+        while (event := await events.get()) is not None:
+            yield sse_event(event["type"], json.dumps(event, default=str))
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/sessions", response_model=list[ChatSessionSummary])
 async def list_sessions(current_user: User = Depends(get_current_user)):
     sessions = await ChatSession.find(
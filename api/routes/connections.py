@@ -16,6 +16,9 @@ from api.utils.auth import get_current_user
 from api.utils.crypto import encrypt_value, decrypt_value
 from api.connectors.presets import get_preset_endpoints
 from api.connectors.rest import RESTConnector
+from api.connectors.breaker import get_breakers
+from api.connectors.tokens import get_token_cache
+from api.services.toolset import get_toolset_registry
 
 router = APIRouter(prefix="/api/connections", tags=["connections"])
 
@@ -29,13 +32,23 @@ def _connection_to_response(conn: ServiceConnection) -> ConnectionResponse:
         frontend_url=conn.frontend_url,
         auth_type=conn.auth_type,
         endpoints=[
-            {"name": e.name, "path": e.path, "method": e.method, "dashboard_label": e.dashboard_label}
+            {
+                "name": e.name,
+                "path": e.path,
+                "method": e.method,
+                "dashboard_label": e.dashboard_label,
+                "refresh_interval": e.refresh_interval,
+                "fields": e.fields,
+                "max_response_bytes": e.max_response_bytes,
+                "pagination": e.pagination.model_dump() if e.pagination else None,
+            }
             for e in conn.endpoints
         ],
         enabled=conn.enabled,
         last_sync_at=conn.last_sync_at.isoformat() if conn.last_sync_at else None,
         last_sync_status=conn.last_sync_status,
         last_sync_error=conn.last_sync_error,
+        circuit_state=conn.circuit_state,
         created_at=conn.created_at.isoformat(),
         updated_at=conn.updated_at.isoformat(),
     )
@@ -57,7 +70,7 @@ async def create_connection(
     encrypted_creds = encrypt_value(json.dumps(data.credentials))
 
     endpoints = [
-        EndpointConfig(name=e.name, path=e.path, method=e.method, dashboard_label=e.dashboard_label)
+        EndpointConfig(**e.model_dump())
         for e in data.endpoints
     ]
 
@@ -66,7 +79,7 @@ async def create_connection(
         preset = get_preset_endpoints(data.service_type)
         if preset:
             endpoints = [
-                EndpointConfig(name=e["name"], path=e["path"], method=e.get("method", "GET"), dashboard_label=e.get("dashboard_label"))
+                EndpointConfig(**e)
                 for e in preset
             ]
 
@@ -82,6 +95,7 @@ async def create_connection(
         enabled=True,
     )
     await conn.insert()
+    get_toolset_registry().invalidate(conn.user_id)
     return _connection_to_response(conn)
 
 
@@ -107,7 +121,7 @@ async def update_connection(
         conn.encrypted_credentials = encrypt_value(json.dumps(data.credentials))
     if data.endpoints is not None:
         conn.endpoints = [
-            EndpointConfig(name=e.name, path=e.path, method=e.method, dashboard_label=e.dashboard_label)
+            EndpointConfig(**e.model_dump())
             for e in data.endpoints
         ]
     if data.enabled is not None:
@@ -115,6 +129,9 @@ async def update_connection(
 
     conn.updated_at = datetime.now(timezone.utc)
     await conn.save()
+    get_token_cache().invalidate_connection(connection_id)
+    get_breakers().reset_connection(connection_id)
+    get_toolset_registry().invalidate(conn.user_id)
     return _connection_to_response(conn)
 
 
@@ -127,6 +144,9 @@ async def delete_connection(
     if not conn or conn.user_id != str(current_user.id):
         raise HTTPException(status_code=404, detail="Connection not found")
     await conn.delete()
+    get_token_cache().invalidate_connection(connection_id)
+    get_breakers().reset_connection(connection_id)
+    get_toolset_registry().invalidate(conn.user_id)
 
 
 @router.post("/{connection_id}/test", response_model=ConnectionTestResponse)
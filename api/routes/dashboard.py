@@ -1,37 +1,127 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from api.config import get_settings
 from api.schemas.orm.user import User
-from api.schemas.orm.dashboard import DashboardSnapshot
-from api.schemas.dto.dashboard import DashboardResponse, RefreshResponse, WidgetData
-from api.services.dashboard import fetch_dashboard_data
+from api.schemas.dto.dashboard import DashboardResponse, RefreshResponse
+from api.services.activity import record_activity
+from api.services.dashboard import fetch_dashboard_data, refresh_in_background
+from api.services.dashboard_cache import get_dashboard_cache
+from api.services.events import dashboard_events
 from api.utils.auth import get_current_user
+from api.utils.dates import age_seconds
+from api.utils.sse import sse_event
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @router.get("", response_model=DashboardResponse)
-async def get_dashboard(current_user: User = Depends(get_current_user)):
-    snapshot = await DashboardSnapshot.find_one(
-        DashboardSnapshot.user_id == str(current_user.id)
-    )
+async def get_dashboard(request: Request, current_user: User = Depends(get_current_user)):
+    user_id = str(current_user.id)
+    await record_activity(user_id)
+    cached = await get_dashboard_cache().load(user_id)
+
+    # Stale-while-revalidate: answer with what we have and refresh behind the response
+    stale_after = get_settings().dashboard_stale_after_seconds
+    if stale_after > 0:
+        age = age_seconds(cached.checked_at)
+        if age is None or age > stale_after:
+            # Only due endpoints: per-endpoint intervals and backoff still apply to page loads
+            refresh_in_background(user_id)
+            response = cached.response.model_copy(update={"refresh_pending": True})
+            return Response(
+                content=response.model_dump_json(),
+                media_type="application/json",
+                headers={"Cache-Control": "no-store"},
+            )
+
+    # Browsers revalidate on every poll; unchanged dashboards cost a header compare
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
-    if not snapshot:
-        return DashboardResponse(
-            widgets=[],
-            last_refreshed_at=None,
-            refresh_errors=[],
-        )
 
-    return DashboardResponse(
-        widgets=[WidgetData(**w) for w in snapshot.widgets],
-        last_refreshed_at=snapshot.last_refreshed_at.isoformat() if snapshot.last_refreshed_at else None,
-        refresh_errors=snapshot.refresh_errors,
+@router.get("/stream")
+async def stream_dashboard(request: Request, current_user: User = Depends(get_current_user)):
+    user_id = str(current_user.id)
+    keepalive = get_settings().dashboard_stream_keepalive_seconds
+    cache = get_dashboard_cache()
+
+    async def events():
+        queue = dashboard_events.subscribe(user_id)
+        try:
+            cached = await cache.load(user_id)
+            etag = cached.etag
+            yield sse_event("snapshot", cached.body.decode())
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # An open dashboard counts as activity for adaptive refresh
+                    await record_activity(user_id)
+                    # Catches snapshots written by other worker processes, which don't publish here
+                    cached = await cache.load(user_id)
+                    if cached.etag != etag:
+                        etag = cached.etag
+                        yield sse_event("snapshot", cached.body.decode())
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+
+                if event["type"] == "widgets":
+                    # Every stream for this user shares the published dict; read it, never mutate it
+                    etag = event.get("etag")
+                    payload = {k: v for k, v in event.items() if k != "etag"}
+                    yield sse_event("widgets", json.dumps(payload))
+                else:
+                    cached = await cache.load(user_id)
+                    etag = cached.etag
+                    yield sse_event("snapshot", cached.body.decode())
+        finally:
+            dashboard_events.unsubscribe(user_id, queue)
+
+    await record_activity(user_id)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.post("/refresh", response_model=RefreshResponse)
-async def refresh_dashboard(current_user: User = Depends(get_current_user)):
-    snapshot = await fetch_dashboard_data(str(current_user.id))
+async def refresh_dashboard(
+    max_age: Optional[int] = Query(None, ge=0),
+    run_async: bool = Query(False, alias="async"),
+    current_user: User = Depends(get_current_user),
+):
+    user_id = str(current_user.id)
+    await record_activity(user_id)
+
+    if run_async:
+        # Don't wait on upstreams; the new data arrives over /api/dashboard/stream
+        refresh_in_background(user_id, force=True)
+        cached = await get_dashboard_cache().load(user_id)
+        return RefreshResponse(
+            success=True,
+            message="Refresh started",
+            widgets_count=len(cached.response.widgets),
+            pending=True,
+        )
+
+    snapshot = await fetch_dashboard_data(user_id, max_age=max_age, force=True)
     return RefreshResponse(
         success=len(snapshot.refresh_errors) == 0,
         message="Dashboard refreshed" if not snapshot.refresh_errors else f"{len(snapshot.refresh_errors)} error(s) during refresh",
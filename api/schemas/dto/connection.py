@@ -1,5 +1,21 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class PaginationConfigDTO(BaseModel):
+    style: Literal["page", "offset", "cursor", "link"] = "page"
+    items_path: Optional[str] = None
+    total_path: Optional[str] = None
+    total_header: Optional[str] = None
+    page_param: str = "page"
+    start_page: int = 1
+    offset_param: str = "offset"
+    limit_param: str = "limit"
+    page_size: Optional[int] = Field(None, gt=0)
+    cursor_param: str = "cursor"
+    cursor_path: str = "next_cursor"
+    max_pages: Optional[int] = Field(None, gt=0)
+    max_items: Optional[int] = Field(None, gt=0)
 
 
 class EndpointConfigDTO(BaseModel):
@@ -7,6 +23,10 @@ class EndpointConfigDTO(BaseModel):
     path: str
     method: str = "GET"
     dashboard_label: Optional[str] = None
+    refresh_interval: Optional[int] = Field(None, ge=30)
+    fields: Optional[list[str]] = None
+    max_response_bytes: Optional[int] = Field(None, gt=0)
+    pagination: Optional[PaginationConfigDTO] = None
 
 
 class ConnectionCreate(BaseModel):
@@ -41,6 +61,7 @@ class ConnectionResponse(BaseModel):
     last_sync_at: Optional[str]
     last_sync_status: Optional[str]
     last_sync_error: Optional[str]
+    circuit_state: Optional[str] = None
     created_at: str
     updated_at: str
 
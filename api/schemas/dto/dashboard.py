@@ -3,6 +3,7 @@ from pydantic import BaseModel
 
 
 class WidgetData(BaseModel):
+    connection_id: Optional[str] = None
     service_type: str
     service_name: str
     frontend_url: Optional[str] = None
@@ -10,15 +11,19 @@ class WidgetData(BaseModel):
     label: str
     data: Optional[list | dict] = None
     error: Optional[str] = None
+    # "circuit_open" or "stale" while cached data is served for a failing service
+    status: Optional[str] = None
 
 
 class DashboardResponse(BaseModel):
     widgets: list[WidgetData]
     last_refreshed_at: Optional[str]
     refresh_errors: list[str]
+    refresh_pending: bool = False
 
 
 class RefreshResponse(BaseModel):
     success: bool
     message: str
     widgets_count: int
+    pending: bool = False
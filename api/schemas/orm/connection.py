@@ -5,11 +5,31 @@ from beanie import Document, Indexed
 from pydantic import BaseModel, Field
 
 
+class PaginationConfig(BaseModel):
+    style: str = "page"  # "page", "offset", "cursor", or "link" (Link: rel="next")
+    items_path: Optional[str] = None  # dot path to the item list; None when the body is the list
+    total_path: Optional[str] = None  # dot path to the total item count, if the API reports one
+    total_header: Optional[str] = None  # or a header carrying it, e.g. "X-Total-Count"
+    page_param: str = "page"
+    start_page: int = 1
+    offset_param: str = "offset"
+    limit_param: str = "limit"
+    page_size: Optional[int] = None  # sent as limit_param; otherwise inferred from the first page
+    cursor_param: str = "cursor"
+    cursor_path: str = "next_cursor"
+    max_pages: Optional[int] = None  # falls back to Settings.upstream_max_pages
+    max_items: Optional[int] = None  # falls back to Settings.upstream_max_items
+
+
 class EndpointConfig(BaseModel):
     name: str
     path: str
     method: str = "GET"
     dashboard_label: Optional[str] = None
+    refresh_interval: Optional[int] = None  # seconds; falls back to Settings.refresh_interval_seconds
+    fields: Optional[list[str]] = None  # dot paths to keep from the response, e.g. ["id", "project.name"]
+    max_response_bytes: Optional[int] = None  # falls back to Settings.upstream_max_response_bytes
+    pagination: Optional[PaginationConfig] = None
 
 
 class ServiceConnection(Document):
@@ -25,6 +45,7 @@ class ServiceConnection(Document):
     last_sync_at: Optional[datetime] = None
     last_sync_status: Optional[str] = None
     last_sync_error: Optional[str] = None
+    circuit_state: Optional[str] = None  # "closed", "open", or "half_open"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
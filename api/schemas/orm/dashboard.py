@@ -9,7 +9,10 @@ class DashboardSnapshot(Document):
     user_id: Indexed(str, unique=True)
     widgets: list[dict] = Field(default_factory=list)
     last_refreshed_at: Optional[datetime] = None
+    checked_at: Optional[datetime] = None  # last refresh that found nothing to fetch
     refresh_errors: list[str] = Field(default_factory=list)
+    last_active_at: Optional[datetime] = None  # last dashboard/agent use, drives adaptive refresh
+    next_refresh_at: Optional[datetime] = None
 
     class Settings:
         name = "dashboard_snapshots"
@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+from beanie import Document, Indexed
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class SchedulerLease(Document):
+    key: Indexed(str, unique=True)  # "shard:<n>" or "worker:<owner>"
+    owner: str
+    expires_at: datetime
+    heartbeat_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "scheduler_leases"
+        # Let Mongo garbage-collect leases of workers that died without releasing them
+        indexes = [IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)]
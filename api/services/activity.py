@@ -0,0 +1,28 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from api.config import get_settings
+from api.schemas.orm.dashboard import DashboardSnapshot
+
+# Last time activity was written per user; keeps dashboard polling from turning into writes
+_recorded: dict[str, float] = {}
+
+
+async def record_activity(user_id: str):
+    settings = get_settings()
+    now_mono = time.monotonic()
+    last = _recorded.get(user_id)
+    if last is not None and now_mono - last < settings.activity_write_interval_seconds:
+        return
+    _recorded[user_id] = now_mono
+
+    now = datetime.now(timezone.utc)
+    idle_cutoff = now - timedelta(seconds=settings.adaptive_idle_after_seconds)
+    # Coming back from dormancy: pull the next refresh forward instead of waiting out the backoff
+    await DashboardSnapshot.find_one({
+        "user_id": user_id,
+        "$or": [{"last_active_at": None}, {"last_active_at": {"$lt": idle_cutoff}}],
+    }).update({"$set": {"next_refresh_at": now}})
+    await DashboardSnapshot.find_one(
+        DashboardSnapshot.user_id == user_id
+    ).update({"$set": {"last_active_at": now}})
@@ -1,115 +1,164 @@
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone
-
-import anthropic
+from typing import AsyncIterator
 
 from api.config import get_settings
-from api.schemas.orm.connection import ServiceConnection
 from api.schemas.orm.chat import ChatSession, ChatMessage
+from api.connectors.breaker import counts_as_failure, get_breakers
 from api.connectors.rest import RESTConnector
-from api.utils.crypto import decrypt_value
+from api.services.dashboard import fetch_widget
+from api.services.llm import get_llm_client
+from api.services.snapshot_storage import load_widget
+from api.services.toolset import Toolset, get_toolset_registry
+from api.utils import metrics
+from api.utils.dates import age_seconds
 
 logger = logging.getLogger(__name__)
 
 
-def _build_tools(connections: list[ServiceConnection]) -> list[dict]:
-    tools = []
-    for conn in connections:
-        for endpoint in conn.endpoints:
-            tool_name = f"{conn.service_type}_{endpoint.name}"
-            # Sanitize tool name to only allow alphanumeric and underscores
-            tool_name = "".join(c if c.isalnum() or c == "_" else "_" for c in tool_name)
-            tools.append({
-                "name": tool_name,
-                "description": f"Fetch {endpoint.dashboard_label or endpoint.name} from {conn.display_name} ({conn.service_type} service). Endpoint: {endpoint.method} {endpoint.path}",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                },
-                "_connection_id": str(conn.id),
-                "_endpoint_name": endpoint.name,
-            })
-    return tools
+def _tool_result(data, age: float, source: str, error: str | None = None) -> str:
+    result = {"data": data, "age_seconds": round(age), "source": source}
+    if error:
+        result["error"] = error
+    return json.dumps(result, default=str)
 
 
 async def _execute_tool(
+    user_id: str,
     tool_name: str,
-    tools: list[dict],
-    connections: list[ServiceConnection],
+    tool_input: dict | None,
+    toolset: Toolset,
 ) -> str:
-    # Find the tool definition
-    tool_def = None
-    for t in tools:
-        if t["name"] == tool_name:
-            tool_def = t
-            break
-
-    if not tool_def:
+    binding = toolset.bindings.get(tool_name)
+    if not binding:
         return json.dumps({"error": f"Unknown tool: {tool_name}"})
 
-    conn_id = tool_def["_connection_id"]
-    endpoint_name = tool_def["_endpoint_name"]
-
-    # Find the connection
-    conn = None
-    for c in connections:
-        if str(c.id) == conn_id:
-            conn = c
-            break
-
-    if not conn:
-        return json.dumps({"error": "Connection not found"})
-
-    # Find the endpoint
-    endpoint = None
-    for e in conn.endpoints:
-        if e.name == endpoint_name:
-            endpoint = e
-            break
-
-    if not endpoint:
-        return json.dumps({"error": "Endpoint not found"})
+    conn, endpoint, auth = binding.connection, binding.endpoint, binding.auth
+    conn_id = str(conn.id)
+    endpoint_name = endpoint.name
 
+    # The scheduler usually fetched this recently: answer from the snapshot when it's fresh enough
+    settings = get_settings()
+    cached = await load_widget(user_id, conn_id, endpoint_name)
+    age = age_seconds(cached.get("fetched_at")) if cached else None
+    usable = age is not None and not cached.get("error") and cached.get("fields") == endpoint.fields
+    fresh = bool((tool_input or {}).get("fresh"))
+    if usable and not fresh and age <= settings.agent_snapshot_max_age_seconds:
+        metrics.incr("agent_tool_snapshot_hits")
+        return _tool_result(cached["data"], age, "snapshot")
+
+    breaker = get_breakers().connection(conn_id)
+    if not breaker.allow():
+        error = f"{conn.display_name} is unavailable, next attempt in {breaker.retry_in():.0f}s"
+        if usable:
+            return _tool_result(cached["data"], age, "snapshot", error=error)
+        return json.dumps({"error": error})
+
+    metrics.incr("agent_tool_live_fetches")
     connector = RESTConnector()
     try:
-        creds = json.loads(decrypt_value(conn.encrypted_credentials))
-        token = await connector.authenticate(conn.base_url, conn.auth_type, creds)
-        result = await connector.fetch_endpoint(conn.base_url, token, endpoint)
-        return json.dumps(result.get("data", {}), default=str)
+        if auth is None:
+            raise ValueError("Stored credentials could not be decrypted")
+        token = await connector.get_token(auth)
+        widget = await fetch_widget(user_id, connector, conn, endpoint, auth, token, cached)
+        breaker.record_success()
+        return _tool_result(widget["data"], 0, "live")
     except Exception as e:
+        if counts_as_failure(e):
+            breaker.record_failure()
+        if usable:
+            # Older data beats no data; the age tells the model how old
+            return _tool_result(cached["data"], age, "snapshot", error=str(e))
         return json.dumps({"error": str(e)})
 
 
-async def chat_with_agent(user_id: str, message: str, session_id: str | None = None) -> tuple[str, str]:
+async def _execute_tools(
+    user_id: str, calls: list, toolset: Toolset
+) -> AsyncIterator[tuple[int, str]]:
+    # Yields (index, result) as each call finishes; the timeout includes time spent queued
+    # behind the concurrency cap, so it bounds the whole turn
     settings = get_settings()
+    limit = asyncio.Semaphore(max(1, settings.agent_tool_concurrency))
+
+    async def call(block) -> str:
+        async with limit:
+            return await _execute_tool(user_id, block.name, block.input, toolset)
+
+    async def run(i: int, block) -> tuple[int, str]:
+        try:
+            result = await asyncio.wait_for(call(block), timeout=settings.agent_tool_timeout_seconds)
+        except asyncio.TimeoutError:
+            result = json.dumps({
+                "error": f"Tool call timed out after {settings.agent_tool_timeout_seconds}s"
+            })
+        return i, result
+
+    tasks = [asyncio.create_task(run(i, block)) for i, block in enumerate(calls)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
 
-    if not settings.anthropic_api_key:
-        return "AI agent is not configured. Please set ANTHROPIC_API_KEY in your environment.", session_id or ""
+SYSTEM_PROMPT = (
+    "You are a helpful household management assistant. You have access to the user's "
+    "connected services and can fetch data from them using tools. Be concise and helpful. "
+    "When presenting data, format it clearly. Tool results report how old their data is "
+    "(age_seconds); ask for fresh data only when that age matters for the question. "
+    "If no services are connected, let the user know they can add connections in Settings."
+)
 
-    # Load or create session
+
+async def _load_session(user_id: str, message: str, session_id: str | None) -> ChatSession:
+    session = None
     if session_id:
         from beanie import PydanticObjectId
         session = await ChatSession.get(PydanticObjectId(session_id))
-        if not session or session.user_id != user_id:
+        if session and session.user_id != user_id:
             session = None
 
-    if not session_id or not session:
+    if not session:
         session = ChatSession(user_id=user_id, title=message[:50])
         await session.insert()
+    return session
+
+
+async def _save_reply(session: ChatSession, content: str, tool_calls: list[dict] | None = None):
+    session.messages.append(ChatMessage(role="assistant", content=content, tool_calls=tool_calls))
+    session.updated_at = datetime.now(timezone.utc)
+    await session.save()
+
+
+async def run_agent(
+    user_id: str, message: str, session_id: str | None = None
+) -> AsyncIterator[dict]:
+    # Yields events as the reply is produced: "session", "text" deltas, "tool_start" and
+    # "tool_end" around each tool call, "error", and finally "done" with the stored reply
+    settings = get_settings()
+
+    client = get_llm_client()
+    if client is None:
+        yield {
+            "type": "done",
+            "session_id": session_id or "",
+            "content": "AI agent is not configured. Please set ANTHROPIC_API_KEY in your environment.",
+        }
+        return
+
+    session = await _load_session(user_id, message, session_id)
+    session_id = str(session.id)
+    yield {"type": "session", "session_id": session_id}
 
     # Add user message
     user_msg = ChatMessage(role="user", content=message)
     session.messages.append(user_msg)
 
-    # Load connections and build tools
-    connections = await ServiceConnection.find(
-        ServiceConnection.user_id == user_id,
-        ServiceConnection.enabled == True,
-    ).to_list()
-
-    tools = _build_tools(connections)
+    # Tool schemas and their bindings are compiled once per user and cached
+    toolset = await get_toolset_registry().get(user_id)
 
     # Build messages for API
     api_messages = [
@@ -117,59 +166,52 @@ async def chat_with_agent(user_id: str, message: str, session_id: str | None = N
         for m in session.messages
     ]
 
-    # Clean tool definitions (remove internal fields)
-    api_tools = [
-        {
-            "name": t["name"],
-            "description": t["description"],
-            "input_schema": t["input_schema"],
-        }
-        for t in tools
-    ] if tools else []
-
-    system_prompt = (
-        "You are a helpful household management assistant. You have access to the user's "
-        "connected services and can fetch data from them using tools. Be concise and helpful. "
-        "When presenting data, format it clearly. If no services are connected, let the user "
-        "know they can add connections in Settings."
-    )
-
-    client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-
     try:
         # Tool-use loop
         tool_calls_log = []
 
         while True:
             kwargs = {
-                "model": "claude-sonnet-4-5-20250929",
-                "max_tokens": 2048,
-                "system": system_prompt,
+                "model": settings.anthropic_model,
+                "max_tokens": settings.anthropic_max_tokens,
+                "system": SYSTEM_PROMPT,
                 "messages": api_messages,
             }
-            if api_tools:
-                kwargs["tools"] = api_tools
+            if toolset.schemas:
+                kwargs["tools"] = toolset.schemas
 
-            response = client.messages.create(**kwargs)
+            async with client.messages.stream(**kwargs) as stream:
+                async for event in stream:
+                    if event.type == "text":
+                        yield {"type": "text", "text": event.text}
+                response = await stream.get_final_message()
 
             if response.stop_reason == "tool_use":
                 # Process tool calls
                 assistant_content = response.content
                 api_messages.append({"role": "assistant", "content": assistant_content})
 
-                tool_results = []
-                for block in assistant_content:
-                    if block.type == "tool_use":
-                        tool_calls_log.append({
-                            "tool": block.name,
-                            "input": block.input,
-                        })
-                        result = await _execute_tool(block.name, tools, connections)
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": result,
-                        })
+                calls = [block for block in assistant_content if block.type == "tool_use"]
+                for block in calls:
+                    tool_calls_log.append({
+                        "tool": block.name,
+                        "input": block.input,
+                    })
+                    yield {"type": "tool_start", "id": block.id, "tool": block.name, "input": block.input}
+
+                # All tool calls of a turn run concurrently; results go back in the original order
+                results: list[str | None] = [None] * len(calls)
+                async for i, result in _execute_tools(user_id, calls, toolset):
+                    results[i] = result
+                    yield {"type": "tool_end", "id": calls[i].id, "tool": calls[i].name}
+                tool_results = [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": result,
+                    }
+                    for block, result in zip(calls, results)
+                ]
 
                 api_messages.append({"role": "user", "content": tool_results})
             else:
@@ -177,22 +219,21 @@ async def chat_with_agent(user_id: str, message: str, session_id: str | None = N
                 text_parts = [b.text for b in response.content if hasattr(b, "text")]
                 assistant_text = "\n".join(text_parts) if text_parts else "I couldn't generate a response."
 
-                assistant_msg = ChatMessage(
-                    role="assistant",
-                    content=assistant_text,
-                    tool_calls=tool_calls_log if tool_calls_log else None,
-                )
-                session.messages.append(assistant_msg)
-                session.updated_at = datetime.now(timezone.utc)
-                await session.save()
-
-                return assistant_text, str(session.id)
+                await _save_reply(session, assistant_text, tool_calls_log if tool_calls_log else None)
+                yield {"type": "done", "session_id": session_id, "content": assistant_text}
+                return
 
     except Exception as e:
         logger.error(f"Agent error: {e}")
         error_msg = f"Sorry, I encountered an error: {str(e)}"
-        assistant_msg = ChatMessage(role="assistant", content=error_msg)
-        session.messages.append(assistant_msg)
-        session.updated_at = datetime.now(timezone.utc)
-        await session.save()
-        return error_msg, str(session.id)
+        await _save_reply(session, error_msg)
+        yield {"type": "error", "message": error_msg}
+        yield {"type": "done", "session_id": session_id, "content": error_msg}
+
+
+async def chat_with_agent(user_id: str, message: str, session_id: str | None = None) -> tuple[str, str]:
+    reply, reply_session_id = "", session_id or ""
+    async for event in run_agent(user_id, message, session_id):
+        if event["type"] == "done":
+            reply, reply_session_id = event["content"], event["session_id"]
+    return reply, reply_session_id
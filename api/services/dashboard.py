@@ -1,70 +1,449 @@
+import asyncio
+import hashlib
 import json
-from datetime import datetime, timezone
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 
-from api.schemas.orm.connection import ServiceConnection
+from beanie import BulkWriter
+
+from api.config import get_settings
+from api.schemas.orm.connection import EndpointConfig, ServiceConnection
 from api.schemas.orm.dashboard import DashboardSnapshot
+from api.schemas.dto.dashboard import WidgetData
+from api.connectors.breaker import CLOSED, get_breakers
 from api.connectors.rest import RESTConnector
+from api.connectors.tokens import UpstreamAuth
+from api.services import refresh_policy
+from api.services.dashboard_cache import dashboard_etag, get_dashboard_cache
+from api.services.events import dashboard_events
+from api.services.snapshot_storage import PAYLOAD_FIELDS, decode_widget, encode_widget
+from api.utils import metrics
 from api.utils.crypto import decrypt_value
+from api.utils.dates import age_seconds, as_utc
+from api.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Concurrent refreshes for the same user share one in-flight run
+_refreshes = SingleFlight()
+# Strong references to background refreshes so they aren't garbage-collected mid-run,
+# keyed like _refreshes so a forced one waiting behind a scheduled run isn't started twice
+_background: dict[tuple[str, bool], asyncio.Task] = {}
+
+
+class _ConnectionRefresh(NamedTuple):
+    widgets: list[dict]
+    error: str | None
+    fetched: bool  # False when no endpoint was due and nothing was requested
+    circuit_state: str = CLOSED
+
+
+def _widget_key(widget: dict) -> tuple[str | None, str]:
+    return (widget.get("connection_id"), widget["endpoint_name"])
+
+
+def _content_hash(data) -> str:
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# Widget fields that change on every fetch without the widget's content changing
+_BOOKKEEPING_FIELDS = ("fetched_at", "unchanged_count", "etag", "last_modified", "retry_at")
+
+
+def _widget_changes(old: list[dict], new: list[dict]) -> tuple[dict, list[int] | None]:
+    # Returns a $set touching only widgets that changed, and their indexes
+    # (None when the whole array had to be replaced)
+    if [_widget_key(w) for w in old] != [_widget_key(w) for w in new]:
+        # Widgets were added, removed or reordered: positional updates won't line up
+        return {"widgets": new}, None
+
+    update = {}
+    changed = []
+    for i, (before, after) in enumerate(zip(old, new)):
+        # content_hash stands in for data, so large payloads are never compared (or decoded)
+        content_keys = (before.keys() | after.keys()) - {"data", "data_blob", *_BOOKKEEPING_FIELDS}
+        if any(before.get(k) != after.get(k) for k in content_keys):
+            update[f"widgets.{i}"] = after
+            changed.append(i)
+            continue
+        for key in _BOOKKEEPING_FIELDS:
+            if before.get(key) != after.get(key):
+                update[f"widgets.{i}.{key}"] = after.get(key)
+    return update, changed
+
+
+def _publish_changes(snapshot: DashboardSnapshot, changed: list[int] | None):
+    if not dashboard_events.has_subscribers(snapshot.user_id):
+        return
+    if changed is None:
+        dashboard_events.publish(snapshot.user_id, {"type": "snapshot"})
+        return
+    dashboard_events.publish(snapshot.user_id, {
+        "type": "widgets",
+        "widgets": [WidgetData(**decode_widget(snapshot.widgets[i])).model_dump() for i in changed],
+        "last_refreshed_at": snapshot.last_refreshed_at.isoformat() if snapshot.last_refreshed_at else None,
+        "refresh_errors": snapshot.refresh_errors,
+        "etag": dashboard_etag(snapshot),
+    })
+
+
+def _validators(widget: dict | None, endpoint: EndpointConfig) -> dict | None:
+    if not widget or widget.get("error"):
+        return None
+    if widget.get("fields") != endpoint.fields:
+        # Stored data was projected differently; a 304 would keep the wrong shape
+        return None
+    if not widget.get("etag") and not widget.get("last_modified"):
+        return None
+    return {"etag": widget.get("etag"), "last_modified": widget.get("last_modified")}
+
+
+def _base_widget(conn: ServiceConnection, endpoint_name: str, label: str) -> dict:
+    return {
+        "connection_id": str(conn.id),
+        "service_type": conn.service_type,
+        "service_name": conn.display_name,
+        "frontend_url": conn.frontend_url,
+        "endpoint_name": endpoint_name,
+        "label": label,
+    }
+
+
+def _stale_widget(
+    conn: ServiceConnection, endpoint: EndpointConfig, prev: dict, error: str, now: datetime
+) -> dict:
+    # The fetch failed but we have good data: keep serving it (payload, hash, fetched_at and
+    # all) and report the failure instead; the endpoint is retried after its base interval
+    return {
+        **prev,
+        **_base_widget(conn, endpoint.name, endpoint.dashboard_label or endpoint.name),
+        "error": None,
+        "status": "stale",
+        "last_error": error,
+        "retry_at": now + timedelta(seconds=refresh_policy.base_interval(endpoint)),
+    }
+
+
+def _fetched_widget(
+    conn: ServiceConnection,
+    endpoint: EndpointConfig,
+    result: dict,
+    prev: dict | None,
+    now: datetime,
+) -> dict:
+    widget = _base_widget(conn, result["name"], result["label"])
+    if result.get("not_modified"):
+        # 304: keep the stored payload (still encoded) and validators as they are
+        widget.update({k: prev[k] for k in PAYLOAD_FIELDS if k in prev})
+        widget.update(
+            error=None,
+            fields=prev.get("fields"),
+            etag=prev.get("etag"),
+            last_modified=prev.get("last_modified"),
+            content_hash=prev.get("content_hash"),
+        )
+    elif result.get("error") and prev and prev.get("content_hash"):
+        return _stale_widget(conn, endpoint, prev, result["error"], now)
+    else:
+        error = result.get("error")
+        widget.update(encode_widget({"data": result.get("data")}))
+        widget.update(
+            error=error,
+            fields=endpoint.fields,
+            etag=result.get("etag"),
+            last_modified=result.get("last_modified"),
+            content_hash=None if error else _content_hash(result.get("data")),
+        )
+
+    unchanged = (
+        prev is not None
+        and not widget["error"]
+        and prev.get("content_hash") == widget["content_hash"]
+    )
+    widget["unchanged_count"] = prev.get("unchanged_count", 0) + 1 if unchanged else 0
+    widget["fetched_at"] = now
+    return widget
+
+
+async def _refresh_connection(
+    connector: RESTConnector,
+    conn: ServiceConnection,
+    previous: dict[tuple[str | None, str], dict],
+    last_active_at: datetime | None,
+    force: bool,
+) -> _ConnectionRefresh:
+    conn_id = str(conn.id)
+    now = datetime.now(timezone.utc)
+    due = [
+        e for e in conn.endpoints
+        if force or refresh_policy.endpoint_due(
+            previous.get((conn_id, e.name)), e, last_active_at, now
+        )
+    ]
+    breaker = get_breakers().connection(conn_id)
+    if due and not breaker.allow():
+        # The service keeps failing: serve what we have instead of waiting out its timeouts
+        metrics.incr("dashboard_circuit_short_circuits")
+        retry_in = breaker.retry_in()
+        retry_at = now + timedelta(seconds=retry_in)
+        widgets = [
+            {
+                **prev,
+                **_base_widget(conn, endpoint.name, endpoint.dashboard_label or endpoint.name),
+                "status": "circuit_open",
+                "retry_at": retry_at,
+            }
+            for endpoint in conn.endpoints
+            if (prev := previous.get((conn_id, endpoint.name)))
+        ]
+        error = f"unavailable, next attempt in {retry_in:.0f}s"
+        return _ConnectionRefresh(widgets, error, False, breaker.state)
+
+    metrics.incr("dashboard_endpoints_fetched", len(due))
+    metrics.incr("dashboard_endpoints_skipped", len(conn.endpoints) - len(due))
+
+    results = {}
+    login_error = None
+    if due:
+        validators = {}
+        for endpoint in due:
+            endpoint_validators = _validators(previous.get((conn_id, endpoint.name)), endpoint)
+            if endpoint_validators:
+                validators[endpoint.name] = endpoint_validators
+
+        try:
+            creds = json.loads(decrypt_value(conn.encrypted_credentials))
+            auth = UpstreamAuth(conn_id, conn.base_url, conn.auth_type, creds)
+            token = await connector.get_token(auth)
+            fetched = await connector.fetch_all(
+                conn.base_url, token, due, auth=auth, validators=validators
+            )
+        except Exception as e:
+            breaker.record_failure()
+            # Credentials or login failed: every due endpoint failed with it
+            login_error = str(e)
+            fetched = [
+                {"name": endpoint.name, "label": endpoint.dashboard_label or endpoint.name,
+                 "data": None, "error": login_error}
+                for endpoint in due
+            ]
+        else:
+            if all(r.get("error") for r in fetched):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        results = {r["name"]: r for r in fetched}
+
+    widgets = []
+    for endpoint in conn.endpoints:
+        label = endpoint.dashboard_label or endpoint.name
+        prev = previous.get((conn_id, endpoint.name))
+        result = results.get(endpoint.name)
+        if result is None:
+            # Not due yet: carry the stored widget over untouched (a fetch clears its status)
+            widgets.append({**prev, **_base_widget(conn, endpoint.name, label)})
+            continue
+
+        widgets.append(_fetched_widget(conn, endpoint, result, prev, now))
+
+    stale = [f"{w['label']}: {w['last_error']}" for w in widgets if w.get("status") == "stale"]
+    error = login_error or "; ".join(stale) or None
+    return _ConnectionRefresh(widgets, error, bool(due), breaker.state)
 
 
-async def fetch_dashboard_data(user_id: str) -> DashboardSnapshot:
+async def fetch_widget(
+    user_id: str,
+    connector: RESTConnector,
+    conn: ServiceConnection,
+    endpoint: EndpointConfig,
+    auth: UpstreamAuth,
+    token: str | None,
+    prev: dict | None,
+) -> dict:
+    # Live fetch of one widget outside a full refresh (e.g. for the agent), written back
+    # into the snapshot so the dashboard and later tool calls see it too
+    result = await connector.fetch_endpoint(
+        conn.base_url, token, endpoint, auth=auth, validators=_validators(prev, endpoint)
+    )
+    widget = _fetched_widget(conn, endpoint, result, prev, datetime.now(timezone.utc))
+    stored = encode_widget(widget)
+
+    updated = await DashboardSnapshot.find_one({
+        "user_id": user_id,
+        "widgets": {"$elemMatch": {"connection_id": str(conn.id), "endpoint_name": endpoint.name}},
+    }).update({"$set": {"widgets.$": stored}})
+    # A widget the snapshot doesn't have yet is added by the next full refresh
+    if updated.matched_count and (prev is None or prev.get("content_hash") != widget["content_hash"]):
+        get_dashboard_cache().invalidate(user_id)
+        if dashboard_events.has_subscribers(user_id):
+            dashboard_events.publish(user_id, {"type": "snapshot"})
+    return decode_widget(stored)
+
+
+async def fetch_dashboard_data(
+    user_id: str, max_age: float | None = None, force: bool = False
+) -> DashboardSnapshot:
+    if max_age is not None and _refreshing(user_id):
+        # A refresh is already running; callers that accept slightly older data don't wait for it
+        snapshot = await DashboardSnapshot.find_one(
+            DashboardSnapshot.user_id == user_id
+        )
+        if snapshot:
+            age = age_seconds(snapshot.last_refreshed_at)
+            if age is not None and age <= max_age:
+                return snapshot
+
+    # The deadline runs inside the flight: a timeout cancels the upstream work itself,
+    # not just one caller's wait on the shielded result
+    timeout = get_settings().scheduler_refresh_timeout_seconds
+    if force:
+        # A scheduled run only fetches due endpoints: let it land, then fetch everything
+        while _refreshes.in_flight((user_id, False)):
+            await _refreshes.wait((user_id, False))
+    elif _refreshes.in_flight((user_id, True)):
+        # A forced run covers everything a scheduled one would fetch
+        force = True
+    return await _refreshes.do(
+        (user_id, force), lambda: asyncio.wait_for(_refresh_dashboard(user_id, force), timeout)
+    )
+
+
+def _refreshing(user_id: str) -> bool:
+    return _refreshes.in_flight((user_id, False)) or _refreshes.in_flight((user_id, True))
+
+
+def refresh_in_background(user_id: str, force: bool = False):
+    key = (user_id, force)
+    if key in _background or _refreshes.in_flight((user_id, True)) or (not force and _refreshing(user_id)):
+        return
+
+    async def run():
+        try:
+            await fetch_dashboard_data(user_id, force=force)
+        except Exception as e:
+            logger.error(f"Background refresh failed for user {user_id}: {e}")
+
+    task = asyncio.create_task(run())
+    _background[key] = task
+    task.add_done_callback(lambda _: _background.pop(key, None))
+
+
+async def _refresh_dashboard(user_id: str, force: bool) -> DashboardSnapshot:
+    settings = get_settings()
     connections = await ServiceConnection.find(
         ServiceConnection.user_id == user_id,
         ServiceConnection.enabled == True,
     ).to_list()
 
+    snapshot = await DashboardSnapshot.find_one(
+        DashboardSnapshot.user_id == user_id
+    )
+    previous = {_widget_key(w): w for w in snapshot.widgets} if snapshot else {}
+    # A brand-new snapshot means the user is setting things up right now
+    last_active_at = snapshot.last_active_at if snapshot else datetime.now(timezone.utc)
+
     connector = RESTConnector()
+    limit = asyncio.Semaphore(max(1, settings.dashboard_refresh_concurrency))
+
+    async def refresh_one(conn: ServiceConnection) -> _ConnectionRefresh:
+        async with limit:
+            return await _refresh_connection(connector, conn, previous, last_active_at, force)
+
+    outcomes = await asyncio.gather(*(refresh_one(c) for c in connections))
+
     widgets = []
     errors = []
+    synced_at = datetime.now(timezone.utc)
+    for conn, outcome in zip(connections, outcomes):
+        widgets.extend(outcome.widgets)
+        if outcome.error:
+            errors.append(f"{conn.display_name}: {outcome.error}")
 
-    for conn in connections:
-        try:
-            creds = json.loads(decrypt_value(conn.encrypted_credentials))
-            token = await connector.authenticate(conn.base_url, conn.auth_type, creds)
-            results = await connector.fetch_all(conn.base_url, token, conn.endpoints)
-
-            for result in results:
-                widget = {
-                    "service_type": conn.service_type,
-                    "service_name": conn.display_name,
-                    "frontend_url": conn.frontend_url,
-                    "endpoint_name": result["name"],
-                    "label": result["label"],
-                    "data": result.get("data"),
-                    "error": result.get("error"),
-                }
-                widgets.append(widget)
-
-            # Update connection sync status
-            conn.last_sync_at = datetime.now(timezone.utc)
-            conn.last_sync_status = "success"
-            conn.last_sync_error = None
-            await conn.save()
+    # Update connection sync status in one round-trip, touching only the sync fields
+    synced = [(c, o) for c, o in zip(connections, outcomes) if o.fetched]
+    status_updates = []
+    for conn, outcome in zip(connections, outcomes):
+        update = {}
+        if outcome.fetched:
+            update.update(
+                last_sync_at=synced_at,
+                last_sync_status="error" if outcome.error else "success",
+                last_sync_error=outcome.error,
+            )
+        if outcome.circuit_state != (conn.circuit_state or CLOSED):
+            update["circuit_state"] = outcome.circuit_state
+        if update:
+            status_updates.append((conn, update))
+    if status_updates:
+        async with BulkWriter() as bulk_writer:
+            for conn, update in status_updates:
+                await ServiceConnection.find_one(ServiceConnection.id == conn.id).update(
+                    {"$set": update}, bulk_writer=bulk_writer
+                )
 
-        except Exception as e:
-            error_msg = f"{conn.display_name}: {str(e)}"
-            errors.append(error_msg)
-            conn.last_sync_at = datetime.now(timezone.utc)
-            conn.last_sync_status = "error"
-            conn.last_sync_error = str(e)
-            await conn.save()
+    now = datetime.now(timezone.utc)
+    endpoints = {(str(c.id), e.name): e for c in connections for e in c.endpoints}
+    next_refresh_at = refresh_policy.next_refresh_at(widgets, endpoints, last_active_at, now)
 
     # Upsert dashboard snapshot
-    snapshot = await DashboardSnapshot.find_one(
-        DashboardSnapshot.user_id == user_id
-    )
     if snapshot:
+        # $set only what changed (and never fields a refresh doesn't own, like last_active_at)
+        update, changed = _widget_changes(snapshot.widgets, widgets)
+        changed_count = len(widgets) if changed is None else len(changed)
+        metrics.incr("snapshot_widgets_changed", changed_count)
+        metrics.incr("snapshot_widgets_unchanged", len(widgets) - changed_count)
+        if synced:
+            update["last_refreshed_at"] = now
+        else:
+            # Nothing was due (or every circuit is open): the data is as current as it can be
+            update["checked_at"] = now
+        if errors != snapshot.refresh_errors:
+            update["refresh_errors"] = errors
+        if snapshot.next_refresh_at is None or as_utc(snapshot.next_refresh_at) != next_refresh_at:
+            update["next_refresh_at"] = next_refresh_at
+
+        if update:
+            # Positional widget updates assume the array we read is still the stored one
+            result = await DashboardSnapshot.find_one(
+                DashboardSnapshot.id == snapshot.id,
+                DashboardSnapshot.last_refreshed_at == snapshot.last_refreshed_at,
+            ).update({"$set": update})
+            if result.matched_count == 0:
+                metrics.incr("snapshot_write_conflicts")
+                await DashboardSnapshot.find_one(DashboardSnapshot.id == snapshot.id).update(
+                    {"$set": {
+                        "widgets": widgets,
+                        "last_refreshed_at": now,
+                        "refresh_errors": errors,
+                        "next_refresh_at": next_refresh_at,
+                    }}
+                )
+            metrics.incr("snapshot_writes")
+        else:
+            metrics.incr("snapshot_writes_skipped")
+
         snapshot.widgets = widgets
-        snapshot.last_refreshed_at = datetime.now(timezone.utc)
         snapshot.refresh_errors = errors
-        await snapshot.save()
+        snapshot.next_refresh_at = next_refresh_at
+        if synced:
+            snapshot.last_refreshed_at = now
+        else:
+            snapshot.checked_at = now
+        if changed is None or changed or "refresh_errors" in update:
+            _publish_changes(snapshot, changed)
     else:
         snapshot = DashboardSnapshot(
             user_id=user_id,
             widgets=widgets,
-            last_refreshed_at=datetime.now(timezone.utc),
+            last_refreshed_at=now,
             refresh_errors=errors,
+            last_active_at=last_active_at,
+            next_refresh_at=next_refresh_at,
         )
         await snapshot.insert()
+        _publish_changes(snapshot, None)
 
+    get_dashboard_cache().invalidate(user_id)
     return snapshot
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+from api.config import get_settings
+from api.schemas.orm.dashboard import DashboardSnapshot
+from api.schemas.dto.dashboard import DashboardResponse, WidgetData
+from api.services.snapshot_storage import decode_widget
+from api.utils.dates import as_utc
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class CachedDashboard(NamedTuple):
+    response: DashboardResponse
+    body: bytes  # serialized response
+    etag: str
+    checked_at: datetime | None  # when the data was last known current, for stale-while-revalidate
+    expires_at: float
+
+
+def _epoch_ms(value: datetime | None) -> str:
+    # Mongo hands datetimes back naive and truncated to milliseconds; the in-memory snapshot a
+    # refresh publishes from has neither, and both must give the same ETag
+    if value is None:
+        return ""
+    return str((as_utc(value) - _EPOCH) // timedelta(milliseconds=1))
+
+
+def dashboard_etag(snapshot: DashboardSnapshot | None) -> str:
+    if snapshot is None:
+        return '"empty"'
+    parts = [
+        _epoch_ms(snapshot.last_refreshed_at),
+        *snapshot.refresh_errors,
+    ]
+    for w in snapshot.widgets:
+        parts.append(json.dumps(
+            [w.get("connection_id"), w.get("endpoint_name"), w.get("label"),
+             w.get("service_name"), w.get("frontend_url"), w.get("content_hash"), w.get("error")],
+            default=str,
+        ))
+    return '"' + hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32] + '"'
+
+
+def build_dashboard_response(snapshot: DashboardSnapshot | None) -> DashboardResponse:
+    if not snapshot:
+        return DashboardResponse(
+            widgets=[],
+            last_refreshed_at=None,
+            refresh_errors=[],
+        )
+
+    return DashboardResponse(
+        widgets=[WidgetData(**decode_widget(w)) for w in snapshot.widgets],
+        last_refreshed_at=snapshot.last_refreshed_at.isoformat() if snapshot.last_refreshed_at else None,
+        refresh_errors=snapshot.refresh_errors,
+    )
+
+
+def _checked_at(snapshot: DashboardSnapshot | None) -> datetime | None:
+    if snapshot is None:
+        return None
+    times = [as_utc(t) for t in (snapshot.last_refreshed_at, snapshot.checked_at) if t is not None]
+    return max(times, default=None)
+
+
+class DashboardCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        # Bounds staleness for snapshots written by other worker processes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CachedDashboard] = OrderedDict()
+
+    def get(self, user_id: str) -> CachedDashboard | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires_at:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def put(self, user_id: str, snapshot: DashboardSnapshot | None) -> CachedDashboard:
+        response = build_dashboard_response(snapshot)
+        entry = CachedDashboard(
+            response=response,
+            body=response.model_dump_json().encode(),
+            etag=dashboard_etag(snapshot),
+            checked_at=_checked_at(snapshot),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    async def load(self, user_id: str) -> CachedDashboard:
+        entry = self.get(user_id)
+        if entry is None:
+            snapshot = await DashboardSnapshot.find_one(
+                DashboardSnapshot.user_id == user_id
+            )
+            entry = self.put(user_id, snapshot)
+        return entry
+
+
+@lru_cache
+def get_dashboard_cache() -> DashboardCache:
+    settings = get_settings()
+    return DashboardCache(
+        max_entries=settings.dashboard_cache_size,
+        ttl=settings.dashboard_cache_ttl_seconds,
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from api.schemas.orm.lease import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def shard_for(user_id: str, shards: int) -> int:
+    return int(hashlib.sha1(user_id.encode()).hexdigest(), 16) % shards
+
+
+async def acquire_lease(key: str, owner: str, ttl: float) -> bool:
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ttl)
+    try:
+        # Matches only if we already hold the lease or it has expired; otherwise the
+        # insert hits the unique key index because someone else holds it
+        await SchedulerLease.find_one({
+            "key": key,
+            "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}],
+        }).upsert(
+            {"$set": {"owner": owner, "expires_at": expires_at, "heartbeat_at": now}},
+            on_insert=SchedulerLease(key=key, owner=owner, expires_at=expires_at, heartbeat_at=now),
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lease(key: str, owner: str):
+    await SchedulerLease.find_one({"key": key, "owner": owner}).delete()
+
+
+class ShardLeases:
+    def __init__(self, owner: str, shards: int, ttl: float):
+        self.owner = owner
+        self.shards = shards
+        self.ttl = ttl
+        self.owned: set[int] = set()
+        self._valid_until = 0.0
+
+    def owns(self, user_id: str) -> bool:
+        # Without a recent successful heartbeat our leases may already belong to someone else
+        if asyncio.get_running_loop().time() > self._valid_until:
+            return False
+        return shard_for(user_id, self.shards) in self.owned
+
+    async def _active_workers(self) -> int:
+        now = datetime.now(timezone.utc)
+        return await SchedulerLease.find({
+            "key": {"$regex": "^worker:"},
+            "expires_at": {"$gt": now},
+        }).count()
+
+    async def heartbeat(self):
+        started = asyncio.get_running_loop().time()
+        await acquire_lease(f"worker:{self.owner}", self.owner, self.ttl)
+        target = math.ceil(self.shards / max(1, await self._active_workers()))
+
+        for shard in list(self.owned):
+            if not await acquire_lease(f"shard:{shard}", self.owner, self.ttl):
+                logger.warning(f"Lost scheduler lease for shard {shard}")
+                self.owned.discard(shard)
+
+        # Hand surplus shards back so newly started workers get a fair share
+        while len(self.owned) > target:
+            shard = self.owned.pop()
+            await release_lease(f"shard:{shard}", self.owner)
+
+        candidates = [s for s in range(self.shards) if s not in self.owned]
+        random.shuffle(candidates)
+        for shard in candidates:
+            if len(self.owned) >= target:
+                break
+            if await acquire_lease(f"shard:{shard}", self.owner, self.ttl):
+                self.owned.add(shard)
+
+        self._valid_until = started + self.ttl
+
+    async def run(self):
+        while True:
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler lease heartbeat failed: {e}")
+            await asyncio.sleep(self.ttl / 3)
+
+    async def release_all(self):
+        for shard in list(self.owned):
+            await release_lease(f"shard:{shard}", self.owner)
+        self.owned.clear()
+        await release_lease(f"worker:{self.owner}", self.owner)
@@ -0,0 +1,31 @@
+import anthropic
+
+from api.config import get_settings
+
+_client: anthropic.AsyncAnthropic | None = None
+
+
+def init_llm_client() -> anthropic.AsyncAnthropic | None:
+    global _client
+    settings = get_settings()
+    if not settings.anthropic_api_key:
+        return None
+    # One client per process: its connection pool is reused by every chat
+    _client = anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        timeout=settings.anthropic_timeout_seconds,
+        max_retries=settings.anthropic_max_retries,
+    )
+    return _client
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_llm_client() -> anthropic.AsyncAnthropic | None:
+    # Lazily create the client for code running outside the app lifespan (scripts, shells)
+    return _client or init_llm_client()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from api.config import get_settings
+from api.schemas.orm.connection import EndpointConfig
+from api.utils.dates import age_seconds, as_utc
+
+
+def activity_factor(last_active_at: datetime | None, now: datetime) -> float:
+    # Users who haven't opened the dashboard or the agent lately get refreshed less often
+    settings = get_settings()
+    idle = age_seconds(last_active_at, now)
+    if idle is None or idle <= settings.adaptive_idle_after_seconds:
+        return 1.0
+    return idle / settings.adaptive_idle_after_seconds
+
+
+def volatility_factor(widget: dict) -> float:
+    # Endpoints whose payload hasn't changed for a few fetches back off exponentially
+    settings = get_settings()
+    streak = widget.get("unchanged_count", 0) - settings.adaptive_unchanged_threshold
+    if streak < 0:
+        return 1.0
+    return min(2.0 ** (streak + 1), settings.adaptive_max_volatility_factor)
+
+
+def base_interval(endpoint: EndpointConfig | None) -> float:
+    if endpoint is not None and endpoint.refresh_interval:
+        return endpoint.refresh_interval
+    return get_settings().refresh_interval_seconds
+
+
+def endpoint_interval(
+    widget: dict,
+    endpoint: EndpointConfig | None,
+    last_active_at: datetime | None,
+    now: datetime,
+) -> float:
+    settings = get_settings()
+    base = base_interval(endpoint)
+    if widget.get("error"):
+        return base
+    interval = base * activity_factor(last_active_at, now) * volatility_factor(widget)
+    return max(base, min(interval, settings.adaptive_max_interval_seconds))
+
+
+def endpoint_due(
+    widget: dict | None,
+    endpoint: EndpointConfig,
+    last_active_at: datetime | None,
+    now: datetime,
+) -> bool:
+    if not widget:
+        return True
+    if widget.get("retry_at") and as_utc(widget["retry_at"]) > now:
+        # Failing (stale) or circuit-open endpoint: nothing to do before its retry time
+        return False
+    if widget.get("error") or not widget.get("fetched_at"):
+        return True
+    interval = endpoint_interval(widget, endpoint, last_active_at, now)
+    return age_seconds(widget["fetched_at"], now) >= interval
+
+
+def next_refresh_at(
+    widgets: list[dict],
+    endpoints: dict[tuple[str | None, str], EndpointConfig],
+    last_active_at: datetime | None,
+    now: datetime,
+) -> datetime:
+    settings = get_settings()
+    candidates = []
+    for widget in widgets:
+        if not widget.get("fetched_at"):
+            continue
+        endpoint = endpoints.get((widget.get("connection_id"), widget["endpoint_name"]))
+        interval = endpoint_interval(widget, endpoint, last_active_at, now)
+        due = as_utc(widget["fetched_at"]) + timedelta(seconds=interval)
+        if widget.get("retry_at"):
+            # The connection's circuit is open: nothing to do before its next probe
+            due = max(due, as_utc(widget["retry_at"]))
+        candidates.append(due)
+    if not candidates:
+        return now + timedelta(seconds=settings.refresh_interval_seconds)
+    return min(candidates)
@@ -1,38 +1,205 @@
 import asyncio
+import heapq
+import itertools
 import logging
+import random
+from datetime import datetime
+from typing import Optional
+
+from beanie.operators import In
+from pydantic import BaseModel
 
 from api.config import get_settings
 from api.schemas.orm.connection import ServiceConnection
+from api.schemas.orm.dashboard import DashboardSnapshot
 from api.services.dashboard import fetch_dashboard_data
+from api.services.leases import ShardLeases, worker_id
+from api.utils import metrics
+from api.utils.dates import age_seconds
 
 logger = logging.getLogger(__name__)
 
 
-async def run_scheduler():
-    settings = get_settings()
-    interval = settings.refresh_interval_seconds
+class _RefreshState(BaseModel):
+    user_id: str
+    last_refreshed_at: Optional[datetime] = None
+    next_refresh_at: Optional[datetime] = None
 
-    while True:
-        try:
-            await asyncio.sleep(interval)
-            # Find all distinct user IDs with enabled connections
-            pipeline = [
-                {"$match": {"enabled": True}},
-                {"$group": {"_id": "$user_id"}},
-            ]
-            results = await ServiceConnection.aggregate(pipeline).to_list()
-            user_ids = [r["_id"] for r in results]
-
-            for user_id in user_ids:
+
+class Scheduler:
+    def __init__(self):
+        settings = get_settings()
+        self.interval = settings.refresh_interval_seconds
+        self.jitter = settings.scheduler_jitter_seconds
+        self.workers = max(1, settings.scheduler_workers)
+        self.refresh_timeout = settings.scheduler_refresh_timeout_seconds
+        self.sync_interval = min(self.interval, settings.scheduler_sync_seconds)
+
+        # Workers split users by shard through Mongo leases, so each user is refreshed by
+        # exactly one process however many API workers or replicas are running
+        self.leases = ShardLeases(
+            owner=worker_id(),
+            shards=settings.scheduler_shards,
+            ttl=settings.scheduler_lease_ttl_seconds,
+        )
+
+        # Min-heap of (due, seq, user_id) on the loop clock; entries whose due time no
+        # longer matches self._due are stale and skipped when popped
+        self._heap: list[tuple[float, int, str]] = []
+        self._due: dict[str, float] = {}
+        self._seq = itertools.count()
+        # Users handed to the worker pool and not finished yet
+        self._active: set[str] = set()
+        self._ready: asyncio.Queue[tuple[str, float]] = asyncio.Queue(maxsize=self.workers)
+        self._wakeup = asyncio.Event()
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _spread(self) -> float:
+        return random.uniform(0, self.jitter) if self.jitter > 0 else 0.0
+
+    def schedule(self, user_id: str, due: float):
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), user_id))
+        self._wakeup.set()
+
+    async def sync(self):
+        # Find all distinct user IDs with enabled connections
+        pipeline = [
+            {"$match": {"enabled": True}},
+            {"$group": {"_id": "$user_id"}},
+        ]
+        results = await ServiceConnection.aggregate(pipeline).to_list()
+        owned = {r["_id"] for r in results if self.leases.owns(r["_id"])}
+
+        for user_id in list(self._due):
+            if user_id not in owned:
+                del self._due[user_id]
+
+        # Due times live on the snapshot: another worker may have refreshed these users
+        # before the shard moved to us, and renewed activity can pull a refresh forward
+        ids = [u for u in owned if u not in self._active]
+        if not ids:
+            return
+        states = await DashboardSnapshot.find(
+            In(DashboardSnapshot.user_id, ids)
+        ).project(_RefreshState).to_list()
+        states = {s.user_id: s for s in states}
+
+        for user_id in ids:
+            state = states.get(user_id)
+            due = self._due_from_state(state)
+            current = self._due.get(user_id)
+            if current is None:
+                self.schedule(user_id, due + self._spread())
+            elif state is not None and due < current - self.jitter:
+                self.schedule(user_id, due)
+
+    def _due_from_state(self, state: _RefreshState | None) -> float:
+        now = self._now()
+        if state is None:
+            return now
+        if state.next_refresh_at is not None:
+            remaining = -age_seconds(state.next_refresh_at)
+        elif state.last_refreshed_at is not None:
+            remaining = self.interval - age_seconds(state.last_refreshed_at)
+        else:
+            remaining = 0.0
+        return now + max(0.0, remaining)
+
+    def lag(self) -> float:
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._now() - self._heap[0][0])
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler sync error: {e}")
+            metrics.set_gauge("scheduler_queue_size", len(self._due))
+            metrics.set_gauge("scheduler_overdue_seconds", self.lag())
+            await asyncio.sleep(self.sync_interval)
+
+    async def _dispatch_loop(self):
+        while True:
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due, _, user_id = self._heap[0]
+            delay = due - self._now()
+            if delay > 0:
                 try:
-                    await fetch_dashboard_data(user_id)
-                    logger.info(f"Refreshed dashboard for user {user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to refresh dashboard for user {user_id}: {e}")
-
-        except asyncio.CancelledError:
-            logger.info("Scheduler cancelled")
-            break
-        except Exception as e:
-            logger.error(f"Scheduler error: {e}")
-            await asyncio.sleep(60)
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            del self._due[user_id]
+            self._active.add(user_id)
+            # Blocks while every worker is busy; the scheduler then falls behind and lag grows
+            await self._ready.put((user_id, due))
+
+    async def _worker(self):
+        while True:
+            user_id, due = await self._ready.get()
+            metrics.set_gauge("scheduler_lag_seconds", max(0.0, self._now() - due))
+            next_due = self._now() + self.interval
+            try:
+                if not self.leases.owns(user_id):
+                    continue
+                # Times out inside the shared flight, so a hung refresh is cancelled, not orphaned
+                snapshot = await fetch_dashboard_data(user_id)
+                next_due = self._due_from_state(_RefreshState(
+                    user_id=user_id,
+                    last_refreshed_at=snapshot.last_refreshed_at,
+                    next_refresh_at=snapshot.next_refresh_at,
+                ))
+                metrics.incr("scheduler_refreshes")
+                logger.info(f"Refreshed dashboard for user {user_id}")
+            except asyncio.TimeoutError:
+                metrics.incr("scheduler_refresh_timeouts")
+                logger.error(f"Refresh for user {user_id} exceeded {self.refresh_timeout}s")
+            except Exception as e:
+                metrics.incr("scheduler_refresh_errors")
+                logger.error(f"Failed to refresh dashboard for user {user_id}: {e}")
+            finally:
+                self._active.discard(user_id)
+                if self.leases.owns(user_id) and user_id not in self._due:
+                    self.schedule(user_id, next_due + self._spread())
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self.leases.run()),
+            asyncio.create_task(self._sync_loop()),
+            asyncio.create_task(self._dispatch_loop()),
+        ]
+        tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                # Hand our shards over right away instead of waiting for the TTL
+                await self.leases.release_all()
+            except Exception as e:
+                logger.error(f"Failed to release scheduler leases: {e}")
+
+
+async def run_scheduler():
+    try:
+        await Scheduler().run()
+    except asyncio.CancelledError:
+        logger.info("Scheduler cancelled")
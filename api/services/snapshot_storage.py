@@ -0,0 +1,129 @@
+import json
+import logging
+import zlib
+
+from api.config import get_settings
+from api.schemas.orm.dashboard import DashboardSnapshot
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install household[zstd]
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Keys that hold a widget's payload in its stored form
+PAYLOAD_FIELDS = ("data", "data_blob", "data_codec")
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return zlib.compress(raw, 6)
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Snapshot payload is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def storage_codec() -> str:
+    codec = get_settings().snapshot_storage_codec
+    if codec == "zstd" and zstandard is None:
+        logger.warning("snapshot_storage_codec=zstd but 'zstandard' is not installed, using zlib")
+        return "zlib"
+    if codec not in ("json", "zlib", "zstd"):
+        return "json"
+    return codec
+
+
+def encode_widget(widget: dict, codec: str | None = None) -> dict:
+    # Stored form: small payloads stay inline as "data", larger ones become a compressed blob
+    codec = codec or storage_codec()
+    decoded = {k: v for k, v in widget.items() if k not in PAYLOAD_FIELDS}
+    data = widget_data(widget)
+    if codec == "json" or data is None:
+        return {**decoded, "data": data}
+
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    if len(raw) < get_settings().snapshot_compress_min_bytes:
+        return {**decoded, "data": data}
+    return {**decoded, "data_blob": _compress(raw, codec), "data_codec": codec}
+
+
+def widget_data(widget: dict):
+    blob = widget.get("data_blob")
+    if blob is None:
+        return widget.get("data")
+    return json.loads(_decompress(bytes(blob), widget.get("data_codec", "zlib")))
+
+
+def decode_widget(widget: dict) -> dict:
+    decoded = {k: v for k, v in widget.items() if k not in PAYLOAD_FIELDS}
+    decoded["data"] = widget_data(widget)
+    return decoded
+
+
+async def load_widget(user_id: str, connection_id: str, endpoint_name: str) -> dict | None:
+    # Pull a single widget out of the snapshot instead of the whole document
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            "widgets": {"$filter": {
+                "input": "$widgets",
+                "as": "w",
+                "cond": {"$and": [
+                    {"$eq": ["$$w.connection_id", connection_id]},
+                    {"$eq": ["$$w.endpoint_name", endpoint_name]},
+                ]},
+            }},
+        }},
+    ]
+    results = await DashboardSnapshot.aggregate(pipeline).to_list()
+    if not results or not results[0].get("widgets"):
+        return None
+    return decode_widget(results[0]["widgets"][0])
+
+
+async def migrate_snapshots(codec: str | None = None) -> int:
+    # Re-encode every stored widget with the given (or configured) codec
+    codec = codec or storage_codec()
+    migrated = 0
+    async for snapshot in DashboardSnapshot.find_all():
+        widgets = [encode_widget(w, codec) for w in snapshot.widgets]
+        if widgets == snapshot.widgets:
+            continue
+        await DashboardSnapshot.find_one(DashboardSnapshot.id == snapshot.id).update(
+            {"$set": {"widgets": widgets}}
+        )
+        migrated += 1
+    return migrated
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from beanie import init_beanie
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Re-encode stored dashboard widget payloads")
+    parser.add_argument("--codec", choices=["json", "zlib", "zstd"], default=None)
+    args = parser.parse_args()
+
+    async def main():
+        settings = get_settings()
+        client = AsyncIOMotorClient(settings.mongodb_url)
+        await init_beanie(
+            database=client[settings.mongodb_db_name],
+            document_models=[DashboardSnapshot],
+        )
+        count = await migrate_snapshots(args.codec)
+        print(f"Migrated {count} snapshot(s)")
+        client.close()
+
+    asyncio.run(main())
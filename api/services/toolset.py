@@ -0,0 +1,126 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from api.config import get_settings
+from api.connectors.tokens import UpstreamAuth
+from api.schemas.orm.connection import EndpointConfig, ServiceConnection
+from api.utils import metrics
+from api.utils.crypto import decrypt_value
+from api.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolBinding:
+    connection: ServiceConnection
+    endpoint: EndpointConfig
+    auth: UpstreamAuth | None  # None when the stored credentials can't be decrypted
+
+
+@dataclass
+class Toolset:
+    schemas: list[dict]  # ready to send as the Messages API "tools" parameter
+    bindings: dict[str, ToolBinding]  # tool name -> what it fetches
+    expires_at: float
+
+
+def _tool_name(conn: ServiceConnection, endpoint: EndpointConfig) -> str:
+    tool_name = f"{conn.service_type}_{endpoint.name}"
+    # Sanitize tool name to only allow alphanumeric and underscores
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in tool_name)
+
+
+def _tool_schema(name: str, conn: ServiceConnection, endpoint: EndpointConfig) -> dict:
+    return {
+        "name": name,
+        "description": f"Fetch {endpoint.dashboard_label or endpoint.name} from {conn.display_name} ({conn.service_type} service). Endpoint: {endpoint.method} {endpoint.path}",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "fresh": {
+                    "type": "boolean",
+                    "description": (
+                        "Fetch live from the service instead of using recently synced data. "
+                        "Only set this when the user needs up-to-the-minute data."
+                    ),
+                },
+            },
+            "required": [],
+        },
+    }
+
+
+def compile_toolset(connections: list[ServiceConnection], ttl: float) -> Toolset:
+    schemas = []
+    bindings = {}
+    for conn in connections:
+        try:
+            creds = json.loads(decrypt_value(conn.encrypted_credentials))
+            auth = UpstreamAuth(str(conn.id), conn.base_url, conn.auth_type, creds)
+        except Exception as e:
+            logger.error(f"Could not decrypt credentials for connection {conn.id}: {e}")
+            auth = None
+
+        for endpoint in conn.endpoints:
+            name = base = _tool_name(conn, endpoint)
+            # Two connections of the same type share endpoint names; keep both reachable
+            suffix = 2
+            while name in bindings:
+                name = f"{base}_{suffix}"
+                suffix += 1
+            schemas.append(_tool_schema(name, conn, endpoint))
+            bindings[name] = ToolBinding(conn, endpoint, auth)
+    return Toolset(schemas, bindings, time.monotonic() + ttl)
+
+
+class ToolsetRegistry:
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024):
+        # Bounds staleness for connection changes made through other worker processes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._toolsets: OrderedDict[str, Toolset] = OrderedDict()
+        self._builds = SingleFlight()
+        # Bumped on invalidation so a build that started before it isn't cached
+        self._versions: dict[str, int] = {}
+
+    async def get(self, user_id: str) -> Toolset:
+        toolset = self._toolsets.get(user_id)
+        if toolset is not None and time.monotonic() < toolset.expires_at:
+            self._toolsets.move_to_end(user_id)
+            metrics.incr("agent_toolset_hits")
+            return toolset
+        return await self._builds.do(user_id, lambda: self._build(user_id))
+
+    async def _build(self, user_id: str) -> Toolset:
+        metrics.incr("agent_toolset_builds")
+        version = self._versions.get(user_id, 0)
+        connections = await ServiceConnection.find(
+            ServiceConnection.user_id == user_id,
+            ServiceConnection.enabled == True,
+        ).to_list()
+        toolset = compile_toolset(connections, self.ttl)
+        if self._versions.get(user_id, 0) != version:
+            return toolset
+        self._toolsets[user_id] = toolset
+        self._toolsets.move_to_end(user_id)
+        while len(self._toolsets) > self.max_entries:
+            self._toolsets.popitem(last=False)
+        return toolset
+
+    def invalidate(self, user_id: str):
+        self._toolsets.pop(user_id, None)
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+@lru_cache
+def get_toolset_registry() -> ToolsetRegistry:
+    settings = get_settings()
+    return ToolsetRegistry(
+        ttl=settings.agent_toolset_ttl_seconds,
+        max_entries=settings.agent_toolset_cache_size,
+    )
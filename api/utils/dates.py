@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+
+
+def as_utc(value: datetime) -> datetime:
+    # Mongo hands back naive datetimes that are implicitly UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def age_seconds(value: datetime | None, now: datetime | None = None) -> float | None:
+    if value is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return (now - as_utc(value)).total_seconds()
@@ -0,0 +1,19 @@
+from collections import Counter
+
+_counters: Counter[str] = Counter()
+_gauges: dict[str, float] = {}
+
+
+def incr(name: str, value: int = 1):
+    _counters[name] += value
+
+
+def set_gauge(name: str, value: float):
+    _gauges[name] = value
+
+
+def get_metrics() -> dict:
+    return {
+        "counters": dict(_counters),
+        "gauges": dict(_gauges),
+    }
@@ -0,0 +1,2 @@
+def sse_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
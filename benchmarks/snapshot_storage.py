@@ -0,0 +1,84 @@
+"""Compare stored size and encode/decode latency of dashboard widget payload codecs.
+
+    python -m benchmarks.snapshot_storage [--widgets 12] [--items 200] [--rounds 50]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from api.services.snapshot_storage import decode_widget, encode_widget, zstandard
+
+try:
+    import bson
+except ImportError:
+    bson = None
+
+
+def _task(i: int) -> dict:
+    return {
+        "id": f"task-{i}",
+        "title": f"Task {i}: " + " ".join(random.choices(["fix", "buy", "call", "plan", "clean", "review"], k=4)),
+        "status": random.choice(["todo", "in_progress", "done"]),
+        "project": {"id": f"project-{i % 7}", "name": f"Project {i % 7}"},
+        "created_at": f"2026-10-{1 + i % 28:02d}T09:00:00Z",
+        "description": "Lorem ipsum dolor sit amet " * random.randint(1, 6),
+    }
+
+
+def _widget(i: int, items: int) -> dict:
+    return {
+        "connection_id": f"conn-{i % 3}",
+        "service_type": "household",
+        "service_name": "Household",
+        "frontend_url": "https://household.example",
+        "endpoint_name": f"endpoint_{i}",
+        "label": f"Endpoint {i}",
+        "data": [_task(n) for n in range(items)],
+        "error": None,
+        "content_hash": "0" * 64,
+        "unchanged_count": 0,
+    }
+
+
+def _stored_size(widgets: list[dict]) -> int:
+    doc = {"user_id": "bench", "widgets": widgets}
+    if bson is not None:
+        return len(bson.encode(doc))
+    import pickle
+    return len(pickle.dumps(doc))
+
+
+def _ms(fn, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--widgets", type=int, default=12)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    widgets = [_widget(i, args.items) for i in range(args.widgets)]
+    codecs = ["json", "zlib"] + (["zstd"] if zstandard is not None else [])
+
+    print(f"{args.widgets} widgets x {args.items} items, size measured as {'BSON' if bson else 'pickle'}")
+    print(f"{'codec':<6} {'size (KiB)':>11} {'encode all':>11} {'decode all':>11} {'decode one':>11}")
+    for codec in codecs:
+        stored = [encode_widget(w, codec) for w in widgets]
+        size = _stored_size(stored) / 1024
+        encode = _ms(lambda: [encode_widget(w, codec) for w in widgets], args.rounds)
+        decode = _ms(lambda: [decode_widget(w) for w in stored], args.rounds)
+        decode_one = _ms(lambda: decode_widget(stored[0]), args.rounds)
+        print(f"{codec:<6} {size:>11.1f} {encode:>9.2f}ms {decode:>9.2f}ms {decode_one:>9.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
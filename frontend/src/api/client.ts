@@ -71,6 +71,64 @@ class ApiClient {
     return this.request<T>('DELETE', endpoint);
   }
 
+  async stream(
+    method: string,
+    endpoint: string,
+    onEvent: (event: string, data: string) => void,
+    options: { body?: unknown; signal?: AbortSignal } = {}
+  ): Promise<void> {
+    const headers: Record<string, string> = {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    };
+
+    if (this.token) {
+      headers['Authorization'] = `Bearer ${this.token}`;
+    }
+
+    const response = await fetch(`${API_URL}${endpoint}`, {
+      method,
+      headers,
+      body: options.body ? JSON.stringify(options.body) : undefined,
+      signal: options.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      if (response.status === 401) {
+        this.setToken(null);
+        window.location.href = '/login';
+      }
+      const error = await response.json().catch(() => ({ detail: 'Request failed' }));
+      throw new Error(error.detail || 'Request failed');
+    }
+
+    // Minimal Server-Sent Events parser (EventSource can't send the Authorization header)
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        const data: string[] = [];
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data.push(line.slice(5).replace(/^ /, ''));
+        }
+        if (data.length > 0) onEvent(event, data.join('\n'));
+      }
+    }
+  }
+
   async login(username: string, password: string): Promise<string> {
     const formData = new URLSearchParams();
     formData.append('username', username);
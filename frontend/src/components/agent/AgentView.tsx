@@ -10,6 +10,8 @@ export function AgentView() {
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [showSessions, setShowSessions] = useState(false);
+  const [streamingReply, setStreamingReply] = useState('');
+  const [activeTool, setActiveTool] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -18,7 +20,7 @@ export function AgentView() {
 
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [messages, streamingReply]);
 
   const fetchSessions = useCallback(async () => {
     const data = await api.get<ChatSession[]>('/api/agent/sessions');
@@ -54,13 +56,34 @@ export function AgentView() {
     setInput('');
     setIsLoading(true);
 
+    // Text is shown as it streams in; the stored reply from the final "done" event replaces it
+    const reply = { streamed: '', content: '' };
     try {
-      const response = await api.post<{ session_id: string; message: ChatMessage }>('/api/agent/chat', {
-        message: userMessage.content,
-        session_id: activeSessionId,
-      });
-      setActiveSessionId(response.session_id);
-      setMessages(prev => [...prev, response.message]);
+      await api.stream(
+        'POST',
+        '/api/agent/chat/stream',
+        (event, data) => {
+          const payload = JSON.parse(data);
+          if (event === 'session') {
+            setActiveSessionId(payload.session_id);
+          } else if (event === 'text') {
+            reply.streamed += payload.text;
+            setStreamingReply(reply.streamed);
+          } else if (event === 'tool_start') {
+            setActiveTool(payload.tool);
+          } else if (event === 'tool_end') {
+            setActiveTool(null);
+          } else if (event === 'done') {
+            reply.content = payload.content;
+            if (payload.session_id) setActiveSessionId(payload.session_id);
+          }
+        },
+        { body: { message: userMessage.content, session_id: activeSessionId } }
+      );
+      setMessages(prev => [
+        ...prev,
+        { role: 'assistant', content: reply.content || reply.streamed, timestamp: new Date().toISOString() },
+      ]);
       fetchSessions();
     } catch (err) {
       setMessages(prev => [
@@ -73,6 +96,8 @@ export function AgentView() {
       ]);
     } finally {
       setIsLoading(false);
+      setStreamingReply('');
+      setActiveTool(null);
     }
   };
 
@@ -158,10 +183,15 @@ export function AgentView() {
             {messages.map((msg, i) => (
               <ChatMessageBubble key={i} message={msg} />
             ))}
-            {isLoading && (
+            {isLoading && streamingReply && (
+              <ChatMessageBubble
+                message={{ role: 'assistant', content: streamingReply, timestamp: new Date().toISOString() }}
+              />
+            )}
+            {isLoading && (!streamingReply || activeTool) && (
               <div className="flex justify-start mb-3">
                 <div className="px-4 py-2.5 rounded-lg text-sm" style={{ backgroundColor: 'var(--bg-raised)', color: 'var(--text-muted)' }}>
-                  Thinking...
+                  {activeTool ? `Using ${activeTool}...` : 'Thinking...'}
                 </div>
               </div>
             )}
@@ -1,10 +1,18 @@
 import { useState, useEffect, useCallback } from 'react';
 import { api } from '../../api/client';
-import { DashboardData, Connection, WidgetData } from '../../types';
+import { DashboardData, DashboardWidgetsEvent, Connection, WidgetData } from '../../types';
 import { TasksWidget } from './TasksWidget';
 import { CalendarWidget } from './CalendarWidget';
 import { QuickActions } from './QuickActions';
 
+const widgetKey = (w: WidgetData) => `${w.connection_id ?? w.service_name}/${w.endpoint_name}`;
+
+function applyWidgetUpdates(dashboard: DashboardData | null, update: DashboardWidgetsEvent): DashboardData {
+  const updated = new Map(update.widgets.map((w) => [widgetKey(w), w]));
+  const widgets = (dashboard?.widgets || []).map((w) => updated.get(widgetKey(w)) ?? w);
+  return { widgets, last_refreshed_at: update.last_refreshed_at, refresh_errors: update.refresh_errors };
+}
+
 function GenericWidget({ widget }: { widget: WidgetData }) {
   if (widget.error) {
     return (
@@ -64,6 +72,34 @@ export function DashboardView() {
     fetchData();
   }, [fetchData]);
 
+  // Live updates pushed by the server whenever the snapshot changes
+  useEffect(() => {
+    const controller = new AbortController();
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const connect = () => {
+      api
+        .stream('GET', '/api/dashboard/stream', (event, data) => {
+          if (event === 'snapshot') {
+            setDashboard(JSON.parse(data) as DashboardData);
+          } else if (event === 'widgets') {
+            const update = JSON.parse(data) as DashboardWidgetsEvent;
+            setDashboard((current) => applyWidgetUpdates(current, update));
+          }
+        }, { signal: controller.signal })
+        .catch(() => undefined)
+        .finally(() => {
+          if (!controller.signal.aborted) retry = setTimeout(connect, 5000);
+        });
+    };
+    connect();
+
+    return () => {
+      controller.abort();
+      if (retry) clearTimeout(retry);
+    };
+  }, []);
+
   const handleRefresh = async () => {
     setIsRefreshing(true);
     try {
@@ -122,6 +158,11 @@ export function DashboardView() {
               Updated {new Date(dashboard.last_refreshed_at).toLocaleTimeString()}
             </span>
           )}
+          {dashboard?.refresh_pending && (
+            <span className="text-xs" style={{ color: 'var(--text-muted)' }}>
+              Updating...
+            </span>
+          )}
           <button
             onClick={handleRefresh}
             disabled={isRefreshing}
@@ -129,6 +129,11 @@ export function SettingsView() {
                 {conn.last_sync_error && (
                   <p className="text-xs mt-1" style={{ color: 'var(--error)' }}>{conn.last_sync_error}</p>
                 )}
+                {conn.circuit_state && conn.circuit_state !== 'closed' && (
+                  <p className="text-xs mt-1" style={{ color: 'var(--text-muted)' }}>
+                    Paused after repeated failures; showing cached data until the service recovers
+                  </p>
+                )}
                 {testResult?.id === conn.id && (
                   <p
                     className="text-xs mt-1"
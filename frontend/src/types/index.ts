@@ -6,11 +6,31 @@ export interface User {
   is_active: boolean;
 }
 
+export interface PaginationConfig {
+  style: 'page' | 'offset' | 'cursor' | 'link';
+  items_path?: string | null;
+  total_path?: string | null;
+  total_header?: string | null;
+  page_param?: string;
+  start_page?: number;
+  offset_param?: string;
+  limit_param?: string;
+  page_size?: number | null;
+  cursor_param?: string;
+  cursor_path?: string;
+  max_pages?: number | null;
+  max_items?: number | null;
+}
+
 export interface EndpointConfig {
   name: string;
   path: string;
   method: string;
   dashboard_label: string | null;
+  refresh_interval?: number | null;
+  fields?: string[] | null;
+  max_response_bytes?: number | null;
+  pagination?: PaginationConfig | null;
 }
 
 export interface Connection {
@@ -25,11 +45,13 @@ export interface Connection {
   last_sync_at: string | null;
   last_sync_status: string | null;
   last_sync_error: string | null;
+  circuit_state?: string | null;
   created_at: string;
   updated_at: string;
 }
 
 export interface WidgetData {
+  connection_id?: string | null;
   service_type: string;
   service_name: string;
   frontend_url: string | null;
@@ -37,12 +59,20 @@ export interface WidgetData {
   label: string;
   data: unknown;
   error: string | null;
+  status?: string | null;
 }
 
 export interface DashboardData {
   widgets: WidgetData[];
   last_refreshed_at: string | null;
   refresh_errors: string[];
+  refresh_pending?: boolean;
+}
+
+export interface DashboardWidgetsEvent {
+  widgets: WidgetData[];
+  last_refreshed_at: string | null;
+  refresh_errors: string[];
 }
 
 export interface ChatMessage {
@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from api.connectors import breaker as breaker_module
+from api.connectors.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    counts_as_failure,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_failed_probe_doubles_the_backoff(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30, max_backoff=100)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 60
+    clock[0] += 60
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.retry_in() == 100
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.trips == 0
+    assert breaker.allow()
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.example.com/tasks")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_only_outages_count_as_failures():
+    assert counts_as_failure(httpx.ConnectError("refused"))
+    assert counts_as_failure(httpx.ReadTimeout("slow"))
+    assert counts_as_failure(_status_error(503))
+    assert not counts_as_failure(_status_error(404))
+    assert not counts_as_failure(_status_error(403))
+    assert not counts_as_failure(CircuitOpenError("open"))
+    assert not counts_as_failure(ValueError("bad credentials"))
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from api.config import get_settings
+from api.services import dashboard
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    # Stand-in for _refresh_dashboard that records what ran, in order
+    log = []
+
+    async def refresh(user_id: str, force: bool):
+        log.append(("start", force))
+        await asyncio.sleep(0.05)
+        log.append(("end", force))
+        return user_id, force
+
+    monkeypatch.setattr(dashboard, "_refresh_dashboard", refresh)
+    return log
+
+
+async def test_concurrent_scheduled_refreshes_share_one_run(refreshes):
+    results = await asyncio.gather(*(dashboard.fetch_dashboard_data("u1") for _ in range(3)))
+    assert results == [("u1", False)] * 3
+    assert refreshes == [("start", False), ("end", False)]
+
+
+async def test_forced_refresh_waits_for_a_scheduled_run(refreshes):
+    scheduled = asyncio.create_task(dashboard.fetch_dashboard_data("u1"))
+    await asyncio.sleep(0.01)
+    forced = await dashboard.fetch_dashboard_data("u1", force=True)
+    assert forced == ("u1", True)
+    assert await scheduled == ("u1", False)
+    assert refreshes == [("start", False), ("end", False), ("start", True), ("end", True)]
+
+
+async def test_scheduled_refresh_joins_a_forced_run(refreshes):
+    forced = asyncio.create_task(dashboard.fetch_dashboard_data("u1", force=True))
+    await asyncio.sleep(0.01)
+    assert await dashboard.fetch_dashboard_data("u1") == ("u1", True)
+    assert await forced == ("u1", True)
+    assert refreshes == [("start", True), ("end", True)]
+
+
+async def test_users_refresh_independently(refreshes):
+    results = await asyncio.gather(
+        dashboard.fetch_dashboard_data("u1"), dashboard.fetch_dashboard_data("u2")
+    )
+    assert results == [("u1", False), ("u2", False)]
+    assert len(refreshes) == 4
+
+
+async def test_timeout_cancels_the_refresh(monkeypatch):
+    cancelled = asyncio.Event()
+
+    async def hang(user_id: str, force: bool):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(dashboard, "_refresh_dashboard", hang)
+    monkeypatch.setattr(get_settings(), "scheduler_refresh_timeout_seconds", 0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await dashboard.fetch_dashboard_data("u1")
+    assert cancelled.is_set()
+    assert not dashboard._refreshing("u1")
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from api.connectors import pagination
+from api.schemas.orm.connection import PaginationConfig
+
+BASE_URL = "https://api.example.com"
+
+
+def _response(link: str | None = None, url: str = f"{BASE_URL}/api/items", **headers) -> httpx.Response:
+    if link:
+        headers["link"] = link
+    return httpx.Response(200, headers=headers, request=httpx.Request("GET", url))
+
+
+def test_page_params_count_from_start_page():
+    paging = PaginationConfig(style="page", page_size=50, start_page=1)
+    assert pagination.page_params(paging, 0, 50) == {"limit": 50, "page": 1}
+    assert pagination.page_params(paging, 2, 50) == {"limit": 50, "page": 3}
+
+
+def test_offset_params_skip_the_offset_on_the_first_page():
+    paging = PaginationConfig(style="offset", offset_param="skip")
+    assert pagination.page_params(paging, 0, None) == {}
+    assert pagination.page_params(paging, 2, 25) == {"skip": 50}
+
+
+def test_cursor_and_link_pages_only_send_the_limit():
+    for style in ("cursor", "link"):
+        paging = PaginationConfig(style=style, page_size=10)
+        assert pagination.page_params(paging, 3, 10) == {"limit": 10}
+
+
+def test_next_cursor_params():
+    paging = PaginationConfig(style="cursor", cursor_path="meta.next", page_size=10)
+    assert pagination.next_cursor_params({"meta": {"next": "abc"}}, paging) == {"cursor": "abc", "limit": 10}
+    assert pagination.next_cursor_params({"meta": {"next": ""}}, paging) is None
+    assert pagination.next_cursor_params({}, paging) is None
+
+
+def test_page_items_and_total():
+    paging = PaginationConfig(items_path="data.items", total_path="data.total")
+    body = {"data": {"items": [1, 2], "total": "7"}}
+    assert pagination.page_items(body, paging) == [1, 2]
+    assert pagination.total_items(_response(), body, paging) == 7
+    with pytest.raises(ValueError):
+        pagination.page_items({"data": {}}, paging)
+
+
+def test_total_from_header():
+    paging = PaginationConfig(total_header="X-Total-Count")
+    assert pagination.total_items(_response(**{"X-Total-Count": "42"}), [], paging) == 42
+    assert pagination.total_items(_response(**{"X-Total-Count": "many"}), [], paging) is None
+
+
+def test_next_link_resolves_relative_links():
+    resp = _response('</api/items?page=2>; rel="next"')
+    assert pagination.next_link(resp, BASE_URL) == f"{BASE_URL}/api/items?page=2"
+
+
+def test_next_link_without_next():
+    assert pagination.next_link(_response(), BASE_URL) is None
+    assert pagination.next_link(_response('</api/items?page=1>; rel="prev"'), BASE_URL) is None
+
+
+def test_next_link_rejects_other_origins():
+    for link in (
+        '<https://evil.example.net/api/items?page=2>; rel="next"',
+        '<http://api.example.com/api/items?page=2>; rel="next"',
+        '<https://api.example.com:8443/api/items?page=2>; rel="next"',
+    ):
+        assert pagination.next_link(_response(link), BASE_URL) is None
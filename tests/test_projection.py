@@ -0,0 +1,33 @@
+from api.connectors.projection import project_fields
+
+
+def test_no_fields_keeps_everything():
+    data = {"id": 1, "title": "x"}
+    assert project_fields(data, None) is data
+    assert project_fields(data, []) is data
+
+
+def test_top_level_and_nested_fields():
+    data = {"id": 1, "title": "x", "project": {"name": "Home", "owner": "a"}, "notes": "long"}
+    assert project_fields(data, ["id", "project.name"]) == {"id": 1, "project": {"name": "Home"}}
+
+
+def test_fields_apply_to_every_list_item():
+    data = [{"id": 1, "title": "a"}, {"id": 2, "title": "b"}]
+    assert project_fields(data, ["id"]) == [{"id": 1}, {"id": 2}]
+
+
+def test_lists_nested_under_a_path():
+    data = {"items": [{"id": 1, "tags": ["x"]}, {"id": 2}], "total": 2}
+    assert project_fields(data, ["items.id"]) == {"items": [{"id": 1}, {"id": 2}]}
+
+
+def test_whole_object_wins_over_its_subpaths():
+    data = {"project": {"name": "Home", "owner": "a"}}
+    assert project_fields(data, ["project", "project.name"]) == data
+    assert project_fields(data, ["project.name", "project"]) == data
+
+
+def test_missing_keys_and_scalars_are_left_alone():
+    assert project_fields({"id": 1}, ["id", "missing.path"]) == {"id": 1}
+    assert project_fields({"project": None}, ["project.name"]) == {"project": None}
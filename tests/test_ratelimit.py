@@ -0,0 +1,55 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from api.connectors.breaker import CircuitOpenError
+from api.connectors.ratelimit import TokenBucket, retry_after_seconds
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("5") == 5.0
+    assert retry_after_seconds("-3") == 0.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+    assert 110 < retry_after_seconds(when) <= 120
+
+
+async def test_burst_then_rate():
+    bucket = TokenBucket(rate=50, burst=2)
+    start = time.monotonic()
+    await bucket.acquire()
+    await bucket.acquire()
+    assert time.monotonic() - start < 0.01
+    await bucket.acquire()
+    assert time.monotonic() - start >= 0.015
+
+
+async def test_short_pause_is_waited_out():
+    bucket = TokenBucket(rate=0, burst=1)
+    bucket.pause(0.05)
+    start = time.monotonic()
+    await bucket.acquire(max_wait=1)
+    assert time.monotonic() - start >= 0.04
+
+
+async def test_long_pause_fails_fast():
+    bucket = TokenBucket(rate=0, burst=1)
+    bucket.pause(3600)
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        await bucket.acquire(max_wait=30)
+    assert time.monotonic() - start < 0.01
+
+
+async def test_waiters_fail_when_the_pause_grows_past_max_wait():
+    bucket = TokenBucket(rate=0, burst=1)
+    bucket.pause(0.05)
+    waiter = asyncio.create_task(bucket.acquire(max_wait=1))
+    await asyncio.sleep(0)
+    bucket.pause(3600)
+    with pytest.raises(CircuitOpenError):
+        await waiter
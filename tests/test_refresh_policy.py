@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from api.config import get_settings
+from api.schemas.orm.connection import EndpointConfig
+from api.services import refresh_policy
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+ENDPOINT = EndpointConfig(name="tasks", path="/api/tasks")
+
+
+def _widget(age: float, **extra) -> dict:
+    return {"connection_id": "c1", "endpoint_name": "tasks", "fetched_at": NOW - timedelta(seconds=age), **extra}
+
+
+def test_missing_or_failed_widgets_are_due():
+    assert refresh_policy.endpoint_due(None, ENDPOINT, NOW, NOW)
+    assert refresh_policy.endpoint_due(_widget(0, error="boom"), ENDPOINT, NOW, NOW)
+    assert refresh_policy.endpoint_due({"endpoint_name": "tasks"}, ENDPOINT, NOW, NOW)
+
+
+def test_due_after_the_base_interval():
+    base = get_settings().refresh_interval_seconds
+    assert not refresh_policy.endpoint_due(_widget(base - 1), ENDPOINT, NOW, NOW)
+    assert refresh_policy.endpoint_due(_widget(base), ENDPOINT, NOW, NOW)
+
+
+def test_endpoint_interval_overrides_the_default():
+    endpoint = EndpointConfig(name="tasks", path="/api/tasks", refresh_interval=3600)
+    assert not refresh_policy.endpoint_due(_widget(1800), endpoint, NOW, NOW)
+    assert refresh_policy.endpoint_due(_widget(3600), endpoint, NOW, NOW)
+
+
+def test_unchanged_endpoints_back_off():
+    settings = get_settings()
+    base = settings.refresh_interval_seconds
+    # The first step past the threshold doubles the interval
+    streak = settings.adaptive_unchanged_threshold
+    assert not refresh_policy.endpoint_due(_widget(base * 1.5, unchanged_count=streak), ENDPOINT, NOW, NOW)
+    assert refresh_policy.endpoint_due(_widget(base * 2, unchanged_count=streak), ENDPOINT, NOW, NOW)
+
+
+def test_idle_users_back_off():
+    settings = get_settings()
+    base = settings.refresh_interval_seconds
+    idle_since = NOW - timedelta(seconds=settings.adaptive_idle_after_seconds * 2)
+    assert not refresh_policy.endpoint_due(_widget(base * 1.5), ENDPOINT, idle_since, NOW)
+    assert refresh_policy.endpoint_due(_widget(base * 2), ENDPOINT, idle_since, NOW)
+
+
+def test_retry_at_holds_off_a_failing_endpoint():
+    widget = _widget(10_000, status="stale", retry_at=NOW + timedelta(seconds=60))
+    assert not refresh_policy.endpoint_due(widget, ENDPOINT, NOW, NOW)
+    widget["retry_at"] = NOW - timedelta(seconds=1)
+    assert refresh_policy.endpoint_due(widget, ENDPOINT, NOW, NOW)
+
+
+def test_next_refresh_at_is_the_earliest_due_widget():
+    base = get_settings().refresh_interval_seconds
+    endpoints = {("c1", "tasks"): ENDPOINT}
+    widgets = [_widget(base - 100), _widget(base - 10)]
+    assert refresh_policy.next_refresh_at(widgets, endpoints, NOW, NOW) == NOW + timedelta(seconds=10)
+
+
+def test_next_refresh_at_waits_for_retry_at():
+    retry_at = NOW + timedelta(seconds=120)
+    widgets = [_widget(10_000, retry_at=retry_at)]
+    assert refresh_policy.next_refresh_at(widgets, {}, NOW, NOW) == retry_at
+
+
+def test_next_refresh_at_without_widgets_uses_the_default_interval():
+    expected = NOW + timedelta(seconds=get_settings().refresh_interval_seconds)
+    assert refresh_policy.next_refresh_at([], {}, NOW, NOW) == expected
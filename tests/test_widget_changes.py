@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from api.services.dashboard import _widget_changes
+
+
+def _widget(name: str, content_hash: str = "h", **extra) -> dict:
+    return {
+        "connection_id": "c1",
+        "endpoint_name": name,
+        "label": name,
+        "data": {"v": content_hash},
+        "content_hash": content_hash,
+        "error": None,
+        **extra,
+    }
+
+
+def test_unchanged_widgets_need_no_update():
+    old = [_widget("tasks"), _widget("events")]
+    assert _widget_changes(old, [dict(w) for w in old]) == ({}, [])
+
+
+def test_changed_widget_is_set_positionally():
+    old = [_widget("tasks"), _widget("events")]
+    new = [_widget("tasks"), _widget("events", content_hash="h2")]
+    update, changed = _widget_changes(old, new)
+    assert update == {"widgets.1": new[1]}
+    assert changed == [1]
+
+
+def test_bookkeeping_only_changes_set_just_those_fields():
+    fetched_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    old = [_widget("tasks", fetched_at=None, unchanged_count=1)]
+    new = [_widget("tasks", fetched_at=fetched_at, unchanged_count=2)]
+    update, changed = _widget_changes(old, new)
+    assert update == {"widgets.0.fetched_at": fetched_at, "widgets.0.unchanged_count": 2}
+    assert changed == []
+
+
+def test_data_is_compared_through_content_hash_only():
+    old = [_widget("tasks")]
+    new = [{**_widget("tasks"), "data": {"something": "else"}}]
+    assert _widget_changes(old, new) == ({}, [])
+
+
+def test_added_widget_replaces_the_array():
+    old = [_widget("tasks")]
+    new = [_widget("tasks"), _widget("events")]
+    assert _widget_changes(old, new) == ({"widgets": new}, None)
+
+
+def test_reordered_widgets_replace_the_array():
+    old = [_widget("tasks"), _widget("events")]
+    new = [old[1], old[0]]
+    assert _widget_changes(old, new) == ({"widgets": new}, None)
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from api.schemas.orm.connection import EndpointConfig, ServiceConnection
+from api.schemas.orm.dashboard import DashboardSnapshot
+from api.services.dashboard import _fetched_widget
+from api.services.dashboard_cache import dashboard_etag
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+ENDPOINT = EndpointConfig(name="tasks", path="/api/tasks", refresh_interval=600)
+CONN = ServiceConnection.model_construct(
+    id="c1", service_type="track", display_name="Track", base_url="https://track.example.com",
+    frontend_url=None, endpoints=[ENDPOINT],
+)
+
+
+def _result(**extra) -> dict:
+    return {"name": "tasks", "label": "tasks", **extra}
+
+
+def test_successful_fetch_replaces_the_widget():
+    widget = _fetched_widget(CONN, ENDPOINT, _result(data=[1, 2]), None, NOW)
+    assert widget["data"] == [1, 2]
+    assert widget["error"] is None
+    assert widget["content_hash"]
+    assert widget["fetched_at"] == NOW
+
+
+def test_failure_keeps_the_last_good_data():
+    earlier = NOW - timedelta(hours=1)
+    prev = _fetched_widget(CONN, ENDPOINT, _result(data=[1, 2]), None, earlier)
+    widget = _fetched_widget(CONN, ENDPOINT, _result(data=None, error="502 Bad Gateway"), prev, NOW)
+    assert widget["data"] == [1, 2]
+    assert widget["content_hash"] == prev["content_hash"]
+    assert widget["fetched_at"] == earlier
+    assert widget["error"] is None
+    assert widget["status"] == "stale"
+    assert widget["last_error"] == "502 Bad Gateway"
+    assert widget["retry_at"] == NOW + timedelta(seconds=600)
+
+
+def test_failure_without_good_data_reports_the_error():
+    prev = _fetched_widget(CONN, ENDPOINT, _result(data=None, error="401"), None, NOW)
+    widget = _fetched_widget(CONN, ENDPOINT, _result(data=None, error="502"), prev, NOW)
+    assert widget["data"] is None
+    assert widget["error"] == "502"
+    assert "status" not in widget
+
+
+def test_etag_survives_the_mongo_round_trip():
+    published = DashboardSnapshot.model_construct(
+        user_id="u1", widgets=[], refresh_errors=[],
+        last_refreshed_at=datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+    )
+    # Mongo returns naive UTC datetimes truncated to milliseconds
+    stored = published.model_copy(update={"last_refreshed_at": datetime(2026, 1, 1, 12, 0, 0, 123000)})
+    assert dashboard_etag(published) == dashboard_etag(stored)